@@ -0,0 +1,84 @@
+"""Encode-time benchmark: FastAPI's default JSON path vs. FastJSONResponse
+
+Run from backend/: `python bench_json.py`. Payloads mirror /api/products
+(5 images x 10 variants per product) and /api/orders (Mongo documents with
+ObjectId and datetime values).
+"""
+import json
+import time
+from datetime import datetime
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+from fast_json import dumps
+
+
+def product(i: int) -> dict:
+    return {
+        "id": f"gid://shopify/Product/{i}",
+        "title": f"Banarasi Silk Saree {i}",
+        "handle": f"banarasi-silk-saree-{i}",
+        "description": "Handwoven pure silk saree with zari border and rich pallu. " * 4,
+        "vendor": "Undhyu",
+        "productType": "Saree",
+        "tags": ["silk", "banarasi", "wedding", "festive"],
+        "createdAt": "2024-01-01T00:00:00Z",
+        "updatedAt": "2024-02-01T00:00:00Z",
+        "images": {"edges": [
+            {"node": {"id": f"img{i}-{j}", "url": f"https://cdn.shopify.com/s/files/{i}/{j}.jpg",
+                      "altText": None, "width": 1200, "height": 1600}}
+            for j in range(5)
+        ]},
+        "variants": {"edges": [
+            {"node": {"id": f"var{i}-{j}", "title": f"Size {j}",
+                      "price": {"amount": "4999.0", "currencyCode": "INR"},
+                      "compareAtPrice": {"amount": "6999.0", "currencyCode": "INR"},
+                      "availableForSale": True, "quantityAvailable": 7,
+                      "selectedOptions": [{"name": "Size", "value": str(j)}]}}
+            for j in range(10)
+        ]},
+    }
+
+
+def order(i: int) -> dict:
+    return {
+        "_id": ObjectId(),
+        "razorpay_order_id": f"order_{i:014d}",
+        "amount": 499900,
+        "currency": "INR",
+        "cart": [{"id": f"var{i}", "title": "Saree", "quantity": 1, "price": 4999.0, "handle": "saree"}],
+        "status": "paid",
+        "created_at": datetime.utcnow(),
+        "paid_at": datetime.utcnow(),
+    }
+
+
+def stdlib_encode(payload) -> bytes:
+    # What FastAPI does for a plain dict: jsonable_encoder, then json.dumps
+    return json.dumps(jsonable_encoder(payload, custom_encoder={ObjectId: str}), ensure_ascii=False,
+                      separators=(",", ":")).encode()
+
+
+def bench(fn, payload, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn(payload)
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    print(f"{'payload':<22}{'bytes':>10}{'default ms':>12}{'orjson ms':>12}{'speedup':>9}")
+    cases = [(f"products x{n}", {"products": [product(i) for i in range(n)],
+                                 "pageInfo": {"hasNextPage": True}, "totalCount": n}) for n in (20, 100, 250)]
+    cases += [(f"orders x{n}", {"orders": [order(i) for i in range(n)]}) for n in (100, 500)]
+    for name, payload in cases:
+        rounds = 20
+        size = len(dumps(payload))
+        default_ms = bench(stdlib_encode, payload, rounds)
+        orjson_ms = bench(dumps, payload, rounds)
+        print(f"{name:<22}{size:>10}{default_ms:>12.2f}{orjson_ms:>12.3f}{default_ms / orjson_ms:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+import asyncio
+import base64
+import json
+import logging
+import re
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+GraphQLCaller = Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+CatalogListener = Callable[[List[Dict[str, Any]]], Any]
+RemovalListener = Callable[[List[str]], Any]
+
+SYNC_STATE_ID = "products"
+
+CATALOG_SYNC_QUERY = """
+query syncProducts($first: Int!, $after: String, $query: String) {
+    products(first: $first, after: $after, query: $query, sortKey: UPDATED_AT) {
+        edges {
+            node {
+                id
+                title
+                handle
+                description
+                vendor
+                productType
+                tags
+                createdAt
+                updatedAt
+                collections(first: 20) {
+                    edges {
+                        node {
+                            handle
+                            title
+                        }
+                    }
+                }
+                images(first: 5) {
+                    edges {
+                        node {
+                            id
+                            url
+                            altText
+                            width
+                            height
+                        }
+                    }
+                }
+                variants(first: 10) {
+                    edges {
+                        node {
+                            id
+                            title
+                            price {
+                                amount
+                                currencyCode
+                            }
+                            compareAtPrice {
+                                amount
+                                currencyCode
+                            }
+                            availableForSale
+                            quantityAvailable
+                            selectedOptions {
+                                name
+                                value
+                            }
+                        }
+                    }
+                }
+            }
+        }
+        pageInfo {
+            hasNextPage
+            endCursor
+        }
+    }
+}
+"""
+
+# Storefront sort keys -> catalog document field
+MIRROR_SORT_FIELDS = {
+    "CREATED_AT": "createdAt",
+    "UPDATED_AT": "updatedAt",
+    "TITLE": "title",
+    "PRICE": "min_price",
+    "BEST_SELLING": "createdAt",
+    "RELEVANCE": "createdAt",
+}
+
+# Internal fields that are not part of the Storefront product shape
+MIRROR_INTERNAL_FIELDS = ("_id", "collections", "collection_titles", "min_price", "max_price", "available", "synced_at")
+
+
+def _edges(connection: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    if not connection:
+        return []
+    return [edge["node"] for edge in connection.get("edges", [])]
+
+
+def _price(money: Optional[Dict[str, Any]]) -> Optional[float]:
+    if not money or money.get("amount") is None:
+        return None
+    return float(money["amount"])
+
+
+def normalize_product(node: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a Storefront product node into a catalog document"""
+    variants = _edges(node.get("variants"))
+    images = _edges(node.get("images"))
+    prices = [p for p in (_price(v.get("price")) for v in variants) if p is not None]
+    collections = _edges(node.get("collections"))
+    return {
+        "_id": node["id"],
+        "id": node["id"],
+        "title": node.get("title"),
+        "handle": node.get("handle"),
+        "description": node.get("description"),
+        "vendor": node.get("vendor"),
+        "productType": node.get("productType"),
+        "tags": node.get("tags") or [],
+        "createdAt": node.get("createdAt"),
+        "updatedAt": node.get("updatedAt"),
+        "images": images,
+        "variants": variants,
+        "collections": [c["handle"] for c in collections],
+        "collection_titles": {c["handle"]: c["title"] for c in collections if c.get("title")},
+        "min_price": min(prices) if prices else None,
+        "max_price": max(prices) if prices else None,
+        "available": any(v.get("availableForSale") for v in variants),
+        "synced_at": datetime.utcnow(),
+    }
+
+
+def to_storefront_product(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild the Storefront product shape returned by /api/products"""
+    product = {k: v for k, v in doc.items() if k not in MIRROR_INTERNAL_FIELDS}
+    product["images"] = {"edges": [{"node": image} for image in doc.get("images", [])]}
+    product["variants"] = {"edges": [{"node": variant} for variant in doc.get("variants", [])]}
+    return product
+
+
+def encode_cursor(sort_value: Any, product_id: str) -> str:
+    raw = json.dumps([sort_value, product_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    try:
+        sort_value, product_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return [sort_value, product_id]
+
+
+class CatalogSync:
+    """Mirror the Storefront product catalog into a MongoDB collection
+
+    A full run walks every product page by `pageInfo.endCursor`. Incremental
+    runs only ask for products updated after the stored high-water mark, in
+    UPDATED_AT order, so a run that dies half-way resumes where it stopped.
+    A completed full run also deletes every document it did not touch, which
+    is how products deleted or unpublished upstream leave the mirror.
+    """
+
+    def __init__(self, db, graphql: GraphQLCaller, page_size: int = 250):
+        self.db = db
+        self.collection = db.catalog
+        self.state = db.catalog_sync_state
+        self.graphql = graphql
+        self.page_size = page_size
+        self.listeners: List[CatalogListener] = []
+        self.removal_listeners: List[RemovalListener] = []
+        self.last_run: Optional[Dict[str, Any]] = None
+        self._lock = asyncio.Lock()
+
+    def add_listener(self, listener: CatalogListener) -> None:
+        """Call `listener(docs)` with the normalized catalog documents of each upserted page"""
+        self.listeners.append(listener)
+
+    def add_removal_listener(self, listener: RemovalListener) -> None:
+        """Call `listener(ids)` with the product ids a full run swept from the mirror"""
+        self.removal_listeners.append(listener)
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    async def high_water_mark(self) -> Optional[str]:
+        state = await self.state.find_one({"_id": SYNC_STATE_ID})
+        return state.get("updated_at_hwm") if state else None
+
+    async def version(self) -> Optional[str]:
+        """Marker of the mirror's contents, shared by every process reading it
+
+        Upstream edits move the high-water mark; deletions move `swept_at`.
+        """
+        state = await self.state.find_one({"_id": SYNC_STATE_ID})
+        if not state or not state.get("updated_at_hwm"):
+            return None
+        swept_at = state.get("swept_at")
+        return f"{state['updated_at_hwm']}|{swept_at.isoformat() if swept_at else ''}"
+
+    async def run(self, full: bool = False) -> Dict[str, Any]:
+        """Sync the catalog; returns counters for the run"""
+        async with self._lock:
+            started = time.monotonic()
+            # MongoDB keeps milliseconds; truncate so this run's own writes never sort before it
+            now = datetime.utcnow()
+            run_started_at = now.replace(microsecond=now.microsecond // 1000 * 1000)
+            hwm = None if full else await self.high_water_mark()
+            query = f"updated_at:>='{hwm}'" if hwm else None
+            stats = {
+                "mode": "full" if full or not hwm else "incremental",
+                "pages": 0, "upserted": 0, "modified": 0, "removed": 0
+            }
+            seen = 0
+
+            after = None
+            while True:
+                data = await self.graphql(CATALOG_SYNC_QUERY, {
+                    "first": self.page_size,
+                    "after": after,
+                    "query": query
+                })
+                connection = data["products"]
+                nodes = _edges(connection)
+                if nodes:
+                    seen += len(nodes)
+                    await self._upsert_page(nodes, stats)
+                    hwm = max(hwm or "", max(node["updatedAt"] for node in nodes))
+                    await self.state.update_one(
+                        {"_id": SYNC_STATE_ID},
+                        {"$set": {"updated_at_hwm": hwm, "updated_at": datetime.utcnow()}},
+                        upsert=True
+                    )
+                stats["pages"] += 1
+
+                if not connection["pageInfo"]["hasNextPage"]:
+                    break
+                after = connection["pageInfo"]["endCursor"]
+
+            # An empty walk is more likely an upstream glitch than an empty store
+            if stats["mode"] == "full" and seen:
+                await self._sweep(run_started_at, stats)
+
+            stats["high_water_mark"] = hwm
+            stats["duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+            stats["finished_at"] = datetime.utcnow()
+            self.last_run = stats
+            return stats
+
+    async def _upsert_page(self, nodes: List[Dict[str, Any]], stats: Dict[str, Any]) -> None:
+        docs = [normalize_product(node) for node in nodes]
+        result = await self.collection.bulk_write(
+            [UpdateOne({"_id": doc["_id"]}, {"$set": doc}, upsert=True) for doc in docs],
+            ordered=False
+        )
+        stats["upserted"] += result.upserted_count
+        stats["modified"] += result.modified_count
+        await self._notify(self.listeners, docs)
+
+    async def _sweep(self, run_started_at: datetime, stats: Dict[str, Any]) -> None:
+        """Delete documents a full run did not see"""
+        stale = {"$or": [{"synced_at": {"$lt": run_started_at}}, {"synced_at": {"$exists": False}}]}
+        ids = [doc["_id"] async for doc in self.collection.find(stale, {"_id": 1})]
+        if not ids:
+            return
+        result = await self.collection.delete_many({"_id": {"$in": ids}})
+        stats["removed"] += result.deleted_count
+        await self.state.update_one(
+            {"_id": SYNC_STATE_ID}, {"$set": {"swept_at": datetime.utcnow()}}, upsert=True
+        )
+        logger.info(f"Catalog sync removed {result.deleted_count} products no longer in the storefront")
+        await self._notify(self.removal_listeners, ids)
+
+    async def _notify(self, listeners: List[Callable[[Any], Any]], payload: Any) -> None:
+        for listener in listeners:
+            try:
+                outcome = listener(payload)
+                if asyncio.iscoroutine(outcome):
+                    await outcome
+            except Exception as e:
+                logger.warning(f"Catalog listener {listener!r} failed: {e}")
+
+    async def iter_documents(self, batch_size: int = 500):
+        """Async-iterate every mirrored catalog document"""
+        async for doc in self.collection.find({}, batch_size=batch_size):
+            yield doc
+
+    async def query_products(
+        self,
+        first: int,
+        after: Optional[str],
+        collection_handle: Optional[str],
+        search_query: Optional[str],
+        sort_key: str,
+        reverse: bool,
+        min_price: Optional[float],
+        max_price: Optional[float],
+        available: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """Serve a /api/products page from the mirror with keyset pagination"""
+        field = MIRROR_SORT_FIELDS[sort_key]
+        direction = DESCENDING if reverse else ASCENDING
+        conditions: List[Dict[str, Any]] = []
+
+        if collection_handle:
+            conditions.append({"collections": collection_handle})
+        if search_query:
+            pattern = re.compile(re.escape(search_query), re.IGNORECASE)
+            conditions.append({"$or": [{"title": pattern}, {"tags": pattern}]})
+        if min_price is not None:
+            conditions.append({"max_price": {"$gte": min_price}})
+        if max_price is not None:
+            conditions.append({"min_price": {"$lte": max_price}})
+        if available is not None:
+            conditions.append({"available": available})
+        if after:
+            value, product_id = decode_cursor(after)
+            op = "$lt" if reverse else "$gt"
+            conditions.append({"$or": [
+                {field: {op: value}},
+                {field: value, "_id": {op: product_id}}
+            ]})
+
+        mongo_filter = {"$and": conditions} if conditions else {}
+        docs = await self.collection.find(mongo_filter) \
+            .sort([(field, direction), ("_id", direction)]) \
+            .limit(first + 1) \
+            .to_list(first + 1)
+
+        has_next = len(docs) > first
+        docs = docs[:first]
+        return {
+            "products": [to_storefront_product(doc) for doc in docs],
+            "pageInfo": {
+                "hasNextPage": has_next,
+                "hasPreviousPage": bool(after),
+                "startCursor": encode_cursor(docs[0].get(field), docs[0]["_id"]) if docs else None,
+                "endCursor": encode_cursor(docs[-1].get(field), docs[-1]["_id"]) if docs else None
+            },
+            "totalCount": len(docs)
+        }
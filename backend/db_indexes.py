@@ -0,0 +1,93 @@
+import logging
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+logger = logging.getLogger(__name__)
+
+
+class IndexSpec(NamedTuple):
+    collection: str
+    keys: List[Tuple[str, int]]
+    name: str
+    options: Dict[str, Any] = {}
+
+    def model(self) -> IndexModel:
+        return IndexModel(self.keys, name=self.name, **self.options)
+
+
+# Every index the backend relies on. Prefixes count: (created_at, _id) also
+# serves plain created_at sorts, (status, created_at, _id) serves status and
+# (timestamp, id) serves status_checks time windows.
+INDEX_REGISTRY: List[IndexSpec] = [
+    IndexSpec("orders", [("razorpay_order_id", ASCENDING)], "razorpay_order_id_unique", {"unique": True}),
+    IndexSpec("orders", [("created_at", DESCENDING), ("_id", DESCENDING)], "created_at_id"),
+    IndexSpec("orders", [("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], "status_created_at_id"),
+    IndexSpec("status_checks", [("timestamp", DESCENDING), ("id", DESCENDING)], "timestamp_id"),
+    IndexSpec("payment_events", [("received_at", ASCENDING)], "received_at_ttl", {"expireAfterSeconds": 7 * 24 * 3600}),
+    IndexSpec("idempotency_keys", [("created_at", ASCENDING)], "created_at_ttl", {"expireAfterSeconds": 24 * 3600}),
+    IndexSpec("catalog", [("updatedAt", ASCENDING)], "updated_at"),
+    IndexSpec("catalog", [("createdAt", ASCENDING), ("_id", ASCENDING)], "created_at_id"),
+    IndexSpec("catalog", [("title", ASCENDING), ("_id", ASCENDING)], "title_id"),
+    IndexSpec("catalog", [("min_price", ASCENDING), ("_id", ASCENDING)], "min_price_id"),
+    IndexSpec("catalog", [("collections", ASCENDING)], "collections"),
+    IndexSpec("catalog", [("handle", ASCENDING)], "handle"),
+    IndexSpec("search_popularity", [("count", DESCENDING)], "count"),
+    IndexSpec("search_popularity", [("last_searched_at", ASCENDING)], "last_searched_at_ttl",
+              {"expireAfterSeconds": 90 * 24 * 3600}),
+]
+
+
+def _collections(registry: List[IndexSpec]) -> List[str]:
+    return sorted({spec.collection for spec in registry})
+
+
+async def apply_indexes(db, registry: List[IndexSpec] = INDEX_REGISTRY) -> Dict[str, Any]:
+    """Create every registered index; existing identical indexes are a no-op"""
+    applied: List[str] = []
+    failed: Dict[str, str] = {}
+    for spec in registry:
+        label = f"{spec.collection}.{spec.name}"
+        try:
+            await db[spec.collection].create_indexes([spec.model()])
+            applied.append(label)
+        except Exception as e:
+            # e.g. duplicate keys blocking a unique index; keep going
+            failed[label] = str(e)
+            logger.error(f"Index {label} could not be created: {e}")
+    return {"applied": applied, "failed": failed}
+
+
+async def index_report(db, registry: List[IndexSpec] = INDEX_REGISTRY) -> Dict[str, Dict[str, List[Any]]]:
+    """Compare registered indexes with what exists: missing, extra and key mismatches"""
+    report: Dict[str, Dict[str, List[Any]]] = {}
+    for collection in _collections(registry):
+        expected = {spec.name: spec for spec in registry if spec.collection == collection}
+        existing = await db[collection].index_information()
+        existing.pop("_id_", None)
+
+        missing = [name for name in expected if name not in existing]
+        extra = [name for name in existing if name not in expected]
+        mismatched = [
+            name for name, spec in expected.items()
+            if name in existing and list(map(tuple, existing[name]["key"])) != list(spec.keys)
+        ]
+        report[collection] = {"missing": missing, "extra": extra, "mismatched": mismatched}
+    return report
+
+
+async def index_usage(db, collections: Optional[List[str]] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """Per-index `$indexStats` usage counters for each collection"""
+    usage: Dict[str, List[Dict[str, Any]]] = {}
+    for collection in collections or _collections(INDEX_REGISTRY):
+        stats = await db[collection].aggregate([{"$indexStats": {}}]).to_list(None)
+        usage[collection] = [
+            {
+                "name": stat["name"],
+                "key": stat["key"],
+                "ops": stat["accesses"]["ops"],
+                "since": stat["accesses"]["since"]
+            }
+            for stat in stats
+        ]
+    return usage
@@ -0,0 +1,75 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from product_table import ProductTable
+
+DEFAULT_PRICE_EDGES = (0.0, 500.0, 1000.0, 2000.0, 5000.0, 10000.0)
+MAX_PRICE_EDGES = 50
+
+
+def _top_values(values: List[str], counts: np.ndarray, limit: int) -> List[Dict[str, Any]]:
+    nonzero = np.flatnonzero(counts)
+    if len(nonzero) > limit:
+        nonzero = nonzero[np.argpartition(-counts[nonzero], limit - 1)[:limit]]
+    ranked = sorted(nonzero.tolist(), key=lambda code: (-counts[code], values[code]))
+    return [{"value": values[code], "count": int(counts[code])} for code in ranked]
+
+
+def price_buckets(prices: np.ndarray, edges: Sequence[float]) -> List[Dict[str, Any]]:
+    """Histogram of product prices; the last bucket is open-ended"""
+    bins = np.append(np.asarray(edges, dtype=float), np.inf)
+    counts, _ = np.histogram(prices[~np.isnan(prices)], bins=bins)
+    return [
+        {"min": float(low), "max": float(high) if np.isfinite(high) else None, "count": int(count)}
+        for low, high, count in zip(bins[:-1], bins[1:], counts)
+    ]
+
+
+def facet_counts(
+    table: ProductTable,
+    collection_handle: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    available: Optional[bool] = None,
+    vendor: Optional[str] = None,
+    product_type: Optional[str] = None,
+    tag: Optional[str] = None,
+    size: Optional[str] = None,
+    price_edges: Sequence[float] = DEFAULT_PRICE_EDGES,
+    limit: int = 50
+) -> Dict[str, Any]:
+    """Vendor/type/tag/size/price counts for the products matching the active filters
+
+    Each facet is counted with every filter except its own, so a shopper who
+    picked one vendor still sees how many products the other vendors have.
+    Without any facet selections the incrementally maintained counts are
+    used as-is.
+    """
+    n = table.row_count
+    base = table.mask(collection_handle=collection_handle, available=available)
+    price = table.mask(min_price=min_price, max_price=max_price)
+    selections = {
+        "vendor": table.vendor.select(vendor, n) if vendor else None,
+        "productType": table.product_type.select(product_type, n) if product_type else None,
+        "tag": table.tags.select(tag, n) if tag else None,
+        "size": table.sizes.select(size, n) if size else None,
+    }
+    unfiltered = collection_handle is None and available is None and min_price is None and max_price is None \
+        and not any(selection is not None for selection in selections.values())
+
+    def mask_without(facet: Optional[str]) -> np.ndarray:
+        mask = base & price if facet != "price" else base.copy()
+        for name, selection in selections.items():
+            if name != facet and selection is not None:
+                mask &= selection
+        return mask
+
+    columns = {"vendor": table.vendor, "productType": table.product_type, "tag": table.tags, "size": table.sizes}
+    facets = {}
+    for name, column in columns.items():
+        counts = column.counts if unfiltered else column.count(mask_without(name))
+        facets[name] = _top_values(column.values, counts, limit)
+    facets["price"] = price_buckets(table.min_price[:n][mask_without("price")], price_edges)
+
+    return {"total": int(np.count_nonzero(mask_without(None))), "facets": facets}
@@ -0,0 +1,97 @@
+import asyncio
+import functools
+import inspect
+from decimal import Decimal
+from typing import Any, Callable, Optional
+
+import orjson
+from bson import ObjectId
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+from starlette.responses import JSONResponse, Response
+
+from http_cache import conditional_handler
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def orjson_default(value: Any) -> Any:
+    """Types orjson does not know natively (datetime/UUID are handled by orjson)"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=orjson_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson, aware of Mongo ObjectIds"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _returns_model(result: Any) -> bool:
+    if isinstance(result, BaseModel):
+        return True
+    return isinstance(result, list) and bool(result) and isinstance(result[0], BaseModel)
+
+
+def fast_json_endpoint(endpoint: Callable, status_code: Optional[int] = None) -> Callable:
+    """Render plain dict/list results with orjson, skipping jsonable_encoder
+
+    Pydantic results are left to FastAPI so response_model validation still
+    applies to them. Headers and status set on an injected `response: Response`
+    parameter are carried over, as FastAPI would do for plain results.
+    """
+    response_params = [
+        name for name, param in inspect.signature(endpoint).parameters.items()
+        if inspect.isclass(param.annotation) and issubclass(param.annotation, Response)
+    ]
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        result = await endpoint(*args, **kwargs)
+        if isinstance(result, Response) or _returns_model(result):
+            return result
+        response = FastJSONResponse(result, status_code=status_code or 200)
+        for name in response_params:
+            sub_response = kwargs.get(name)
+            if sub_response is None:
+                continue
+            if sub_response.status_code:
+                response.status_code = sub_response.status_code
+            for key, value in sub_response.raw_headers:
+                if key != b"content-length":
+                    response.raw_headers.append((key, value))
+        return response
+
+    return wrapper
+
+
+class FastJSONRoute(APIRoute):
+    """APIRoute that sends plain results straight to FastJSONResponse
+
+    Endpoints marked with `http_cache(...)` also get ETag/If-None-Match and
+    Cache-Control handling.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        self.http_cache_policy = getattr(endpoint, "http_cache_policy", None)
+        if asyncio.iscoroutinefunction(endpoint):
+            endpoint = fast_json_endpoint(endpoint, kwargs.get("status_code"))
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        if self.http_cache_policy is None:
+            return handler
+        return conditional_handler(handler, self.http_cache_policy)
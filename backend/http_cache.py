@@ -0,0 +1,86 @@
+import hashlib
+from typing import Awaitable, Callable, NamedTuple, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+VersionFn = Callable[[Request], Optional[str]]
+
+
+class HttpCachePolicy(NamedTuple):
+    max_age: int
+    stale_while_revalidate: int = 0
+    private: bool = False
+    # Cheap validator for the response (e.g. catalog version + query); skips the
+    # endpoint and serialization entirely on a match. None falls back to a body hash.
+    version: Optional[VersionFn] = None
+
+    def cache_control(self) -> str:
+        directives = ["private" if self.private else "public", f"max-age={self.max_age}"]
+        if self.stale_while_revalidate:
+            directives.append(f"stale-while-revalidate={self.stale_while_revalidate}")
+        return ", ".join(directives)
+
+
+def http_cache(
+    max_age: int,
+    stale_while_revalidate: int = 0,
+    private: bool = False,
+    version: Optional[VersionFn] = None
+) -> Callable:
+    """Mark a GET endpoint for ETag/If-None-Match handling and Cache-Control headers"""
+    policy = HttpCachePolicy(max_age, stale_while_revalidate, private, version)
+
+    def decorator(endpoint: Callable) -> Callable:
+        endpoint.http_cache_policy = policy
+        return endpoint
+
+    return decorator
+
+
+def make_etag(data: bytes) -> str:
+    return '"' + hashlib.blake2b(data, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as RFC 9110 specifies for If-None-Match"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def conditional_handler(
+    handler: Callable[[Request], Awaitable[Response]],
+    policy: HttpCachePolicy
+) -> Callable[[Request], Awaitable[Response]]:
+    """Wrap a route handler with strong ETags, 304s and Cache-Control"""
+
+    async def handle(request: Request) -> Response:
+        if request.method not in ("GET", "HEAD"):
+            return await handler(request)
+
+        if_none_match = request.headers.get("if-none-match")
+        version = policy.version(request) if policy.version else None
+        etag = make_etag(f"{request.url.path}?{request.url.query}|{version}".encode()) if version else None
+        if etag and etag_matches(if_none_match, etag):
+            return not_modified(etag, policy)
+
+        response = await handler(request)
+        body = getattr(response, "body", None)
+        if response.status_code != 200 or body is None:
+            return response
+
+        etag = etag or make_etag(body)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag, policy)
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = policy.cache_control()
+        return response
+
+    return handle
+
+
+def not_modified(etag: str, policy: HttpCachePolicy) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": policy.cache_control()})
@@ -0,0 +1,142 @@
+import asyncio
+import hashlib
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+import orjson
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyConflict(Exception):
+    """The key is in use by a different request, or its first call is still running"""
+
+
+def request_fingerprint(payload: Any) -> str:
+    return hashlib.sha256(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+class IdempotencyStore:
+    """Run a handler at most once per Idempotency-Key
+
+    Completed responses live in a TTL-indexed collection and are replayed
+    as-is. Concurrent duplicates in this process await the first call's
+    task; duplicates in other workers see the `in_progress` record and poll
+    until it completes. Failed calls are forgotten so the client can retry.
+    An `in_progress` record whose `lease` has expired belongs to a worker that
+    died mid-call, and the next caller takes it over.
+    """
+
+    def __init__(
+        self,
+        collection,
+        wait_timeout: float = 15.0,
+        poll_interval: float = 0.1,
+        lease: float = 120.0
+    ):
+        self.collection = collection
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.lease = timedelta(seconds=lease)
+        self._in_flight: Dict[str, Tuple[str, asyncio.Task]] = {}
+        self.replays = 0
+        self.coalesced = 0
+        self.takeovers = 0
+
+    async def run(self, key: str, fingerprint: str, handler: Callable[[], Awaitable[Any]]) -> Any:
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self.coalesced += 1
+            stored_fingerprint, task = in_flight
+            if stored_fingerprint != fingerprint:
+                raise IdempotencyConflict("Idempotency-Key reused with a different request")
+        else:
+            # The call runs in its own task: a cancelled first caller only
+            # abandons its wait, duplicates still get the result
+            task = asyncio.create_task(self._run_once(key, fingerprint, handler))
+            self._in_flight[key] = (fingerprint, task)
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(key, (None, None))[1] is task:
+            del self._in_flight[key]
+        # Waiters re-raise it; avoid "exception was never retrieved" noise
+        if not task.cancelled():
+            task.exception()
+
+    async def _run_once(self, key: str, fingerprint: str, handler: Callable[[], Awaitable[Any]]) -> Any:
+        token = uuid.uuid4().hex
+        while True:
+            try:
+                await self.collection.insert_one({
+                    "_id": key,
+                    "fingerprint": fingerprint,
+                    "status": "in_progress",
+                    "lease": token,
+                    "lease_expires_at": datetime.utcnow() + self.lease,
+                    "created_at": datetime.utcnow()
+                })
+                break
+            except DuplicateKeyError:
+                found, result = await self._wait_for_stored(key, fingerprint, token)
+                if found:
+                    return result
+                if await self._owns(key, token):
+                    break
+                # The other worker's call failed and was forgotten; take over
+
+        try:
+            result = await handler()
+        except BaseException:
+            await self.collection.delete_one({"_id": key, "lease": token})
+            raise
+
+        await self.collection.update_one(
+            {"_id": key},
+            {"$set": {"status": "completed", "response": result, "completed_at": datetime.utcnow()}}
+        )
+        return result
+
+    async def _owns(self, key: str, token: str) -> bool:
+        record = await self.collection.find_one({"_id": key}, {"lease": 1, "status": 1})
+        return record is not None and record["status"] == "in_progress" and record.get("lease") == token
+
+    async def _take_over(self, record: Dict[str, Any], token: str) -> bool:
+        """Claim an `in_progress` record whose lease has expired"""
+        claimed = await self.collection.find_one_and_update(
+            {"_id": record["_id"], "status": "in_progress", "lease": record.get("lease")},
+            {"$set": {"lease": token, "lease_expires_at": datetime.utcnow() + self.lease}}
+        )
+        if claimed is not None:
+            self.takeovers += 1
+            logger.warning(f"Took over idempotency key {record['_id']} after its lease expired")
+        return claimed is not None
+
+    async def _wait_for_stored(self, key: str, fingerprint: str, token: str) -> Tuple[bool, Any]:
+        deadline = asyncio.get_running_loop().time() + self.wait_timeout
+        while True:
+            record = await self.collection.find_one({"_id": key})
+            if record is None:
+                return False, None
+            if record["fingerprint"] != fingerprint:
+                raise IdempotencyConflict("Idempotency-Key reused with a different request")
+            if record["status"] == "completed":
+                self.replays += 1
+                return True, record["response"]
+            if record["lease_expires_at"] <= datetime.utcnow() and await self._take_over(record, token):
+                return False, None
+            if asyncio.get_running_loop().time() >= deadline:
+                raise IdempotencyConflict("Original request is still in progress")
+            await asyncio.sleep(self.poll_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._in_flight),
+            "replays": self.replays,
+            "coalesced": self.coalesced,
+            "takeovers": self.takeovers
+        }
@@ -0,0 +1,187 @@
+import asyncio
+import hashlib
+import hmac
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+HANDLED_EVENTS = ("payment.captured", "payment.failed", "order.paid")
+
+
+def verify_webhook_signature(body: bytes, signature: Optional[str], secret: str) -> bool:
+    """Check X-Razorpay-Signature: hex HMAC-SHA256 of the raw body"""
+    if not signature or not secret:
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def sign_webhook_body(body: bytes, secret: str) -> str:
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def event_entity(event: Dict[str, Any], name: str) -> Dict[str, Any]:
+    return (event.get("payload", {}).get(name) or {}).get("entity") or {}
+
+
+def order_transition(event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Map a webhook event to a conditional update on `orders`
+
+    Orders only move forward, from created to paid, so duplicates and
+    out-of-order deliveries are no-ops: a late payment.failed cannot undo a
+    captured payment. A failed attempt is recorded on the order but leaves it
+    `created`: Razorpay lets the shopper retry on the same order, and the
+    reconciler keeps checking created orders in case that webhook is lost.
+    """
+    kind = event.get("event")
+    payment = event_entity(event, "payment")
+    order = event_entity(event, "order")
+    order_id = payment.get("order_id") or order.get("id")
+    if not order_id:
+        return None
+
+    if kind in ("payment.captured", "order.paid"):
+        return {
+            "filter": {"razorpay_order_id": order_id, "status": {"$ne": "paid"}},
+            "update": {"$set": {
+                "status": "paid",
+                "razorpay_payment_id": payment.get("id"),
+                "paid_at": datetime.utcnow(),
+                "payment_details": payment or order,
+                "paid_via": "webhook"
+            }}
+        }
+    if kind == "payment.failed":
+        return {
+            # Each attempt is counted once, however often it is seen
+            "filter": {
+                "razorpay_order_id": order_id,
+                "status": "created",
+                "failed_payment_id": {"$ne": payment.get("id")}
+            },
+            "update": {
+                "$set": {
+                    "failed_payment_id": payment.get("id"),
+                    "failure_reason": payment.get("error_description"),
+                    "failed_at": datetime.utcnow()
+                },
+                "$inc": {"failed_attempts": 1}
+            }
+        }
+    return None
+
+
+class PaymentEventProcessor:
+    """In-process queue that applies Razorpay webhook events to orders
+
+    The webhook handler only verifies and enqueues, then acknowledges.
+    Workers dedupe on the event id: first against a small in-memory LRU, then
+    against `payment_events`, whose unique `_id` makes concurrent deliveries of
+    the same event race-free. The order update itself is conditional, see
+    `order_transition`.
+    """
+
+    def __init__(self, db, workers: int = 4, max_queue: int = 10000, recent_ids: int = 50000):
+        self.db = db
+        self.workers = workers
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=max_queue)
+        self._recent: "OrderedDict[str, None]" = OrderedDict()
+        self._recent_max = recent_ids
+        self._tasks: List[asyncio.Task] = []
+        self.received = 0
+        self.duplicates = 0
+        self.applied = 0
+        self.ignored = 0
+        self.errors = 0
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Drain what is queued, then stop the workers"""
+        await self.queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, event_id: str, event: Dict[str, Any]) -> bool:
+        """Enqueue without waiting; False when the event is a known duplicate
+
+        Raises asyncio.QueueFull when saturated so the caller can ask Razorpay
+        to retry later.
+        """
+        self.received += 1
+        if event_id in self._recent:
+            self.duplicates += 1
+            return False
+        self.queue.put_nowait({"id": event_id, "event": event})
+        self._remember(event_id)
+        return True
+
+    def _remember(self, event_id: str) -> None:
+        self._recent[event_id] = None
+        if len(self._recent) > self._recent_max:
+            self._recent.popitem(last=False)
+
+    async def _worker(self) -> None:
+        while True:
+            item = await self.queue.get()
+            try:
+                await self.process(item["id"], item["event"])
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Payment event {item['id']} failed: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def process(self, event_id: str, event: Dict[str, Any]) -> None:
+        try:
+            await self._apply(event_id, event)
+        except Exception:
+            # Forget the event on every failure path so a redelivery gets another chance
+            self._recent.pop(event_id, None)
+            raise
+
+    async def _apply(self, event_id: str, event: Dict[str, Any]) -> None:
+        transition = order_transition(event)
+        try:
+            await self.db.payment_events.insert_one({
+                "_id": event_id,
+                "event": event.get("event"),
+                "order_id": transition["filter"]["razorpay_order_id"] if transition else None,
+                "received_at": datetime.utcnow()
+            })
+        except DuplicateKeyError:
+            self.duplicates += 1
+            return
+
+        if transition is None:
+            self.ignored += 1
+            return
+
+        try:
+            result = await self.db.orders.update_one(transition["filter"], transition["update"])
+        except Exception:
+            await self.db.payment_events.delete_one({"_id": event_id})
+            raise
+
+        if result.modified_count:
+            self.applied += 1
+        else:
+            self.ignored += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.queue.qsize(),
+            "received": self.received,
+            "duplicates": self.duplicates,
+            "applied": self.applied,
+            "ignored": self.ignored,
+            "errors": self.errors
+        }
@@ -0,0 +1,89 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Set
+
+from product_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class Prefetcher:
+    """Speculatively load pages into a TTLCache before they are asked for
+
+    At most `max_concurrency` prefetches run at once; anything beyond that,
+    or anything scheduled while `should_skip()` is true (e.g. the upstream
+    budget is low), is dropped rather than queued. A prefetched key counts
+    as a hit when a real request asks for it, either from the cache or while
+    the prefetch is still in flight.
+    """
+
+    def __init__(
+        self,
+        cache: TTLCache,
+        max_concurrency: int = 4,
+        should_skip: Callable[[], bool] = lambda: False,
+        max_tracked: int = 4096
+    ):
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self.should_skip = should_skip
+        self.max_tracked = max_tracked
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self._prefetched: "OrderedDict[Hashable, None]" = OrderedDict()
+        self.scheduled = 0
+        self.completed = 0
+        self.skipped = 0
+        self.failed = 0
+        self.hits = 0
+
+    def schedule(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> bool:
+        if key in self._tasks or key in self.cache:
+            return False
+        if len(self._tasks) >= self.max_concurrency or self.should_skip():
+            self.skipped += 1
+            return False
+        self.scheduled += 1
+        self._tasks[key] = asyncio.create_task(self._prefetch(key, loader))
+        return True
+
+    async def _prefetch(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            self.cache.set(key, await loader())
+            self.completed += 1
+            self._prefetched[key] = None
+            while len(self._prefetched) > self.max_tracked:
+                self._prefetched.popitem(last=False)
+        except Exception as e:
+            self.failed += 1
+            logger.debug(f"Prefetch skipped for {key!r}: {e}")
+        finally:
+            self._tasks.pop(key, None)
+
+    def record_request(self, key: Hashable) -> None:
+        """Call before serving `key` so prefetch hits can be counted"""
+        if key in self._tasks:
+            self.hits += 1
+        elif key in self._prefetched:
+            del self._prefetched[key]
+            if key in self.cache:
+                self.hits += 1
+
+    async def close(self) -> None:
+        tasks: Set[asyncio.Task] = set(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._tasks),
+            "scheduled": self.scheduled,
+            "completed": self.completed,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.scheduled if self.scheduled else 0.0
+        }
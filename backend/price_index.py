@@ -0,0 +1,136 @@
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+
+class VariantPrice(NamedTuple):
+    price: float
+    currency: str
+    available: bool
+    product_id: str
+    updated_at: float
+
+
+class CartProblem(NamedTuple):
+    item_id: str
+    reason: str
+
+
+def product_variants(product: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Variants of a Storefront product node or a flattened catalog document"""
+    variants = product.get("variants") or []
+    if isinstance(variants, dict):
+        return [edge["node"] for edge in variants.get("edges", [])]
+    return variants
+
+
+def to_paise(amount: float) -> int:
+    return int(round(amount * 100))
+
+
+class PriceIndex:
+    """variant id -> (price, currencyCode, availableForSale), fed from product data
+
+    Every product that passes through the backend (Storefront pages, catalog
+    sync) refreshes its variants here, replacing changed prices and dropping
+    variants that disappeared. A product id resolves to its first variant,
+    which is what the storefront grid adds to the cart. Entries older than
+    `max_age` are treated as unknown so checkout refetches them; catalog
+    documents age from their `synced_at`, not from when they were indexed.
+    """
+
+    def __init__(self, max_age: float = 900.0, clock: Callable[[], float] = time.monotonic):
+        self.max_age = max_age
+        self._clock = clock
+        self.variants: Dict[str, VariantPrice] = {}
+        self.product_variants: Dict[str, Tuple[str, ...]] = {}
+        self.price_changes = 0
+
+    def __len__(self) -> int:
+        return len(self.variants)
+
+    def update_products(self, products: Iterable[Dict[str, Any]]) -> None:
+        for product in products:
+            product_id = product["id"]
+            updated_at = self._entry_time(product.get("synced_at"))
+            variant_ids = [
+                variant["id"] for variant in product_variants(product)
+                if self._store(variant, product_id, updated_at)
+            ]
+
+            for stale_id in set(self.product_variants.get(product_id, ())) - set(variant_ids):
+                self.variants.pop(stale_id, None)
+            if variant_ids:
+                self.product_variants[product_id] = tuple(variant_ids)
+            else:
+                self.product_variants.pop(product_id, None)
+
+    def update_variant(self, variant: Dict[str, Any], product_id: str) -> None:
+        """Refresh one variant without changing its product's variant list"""
+        self._store(variant, product_id)
+
+    def _entry_time(self, synced_at: Optional[datetime]) -> float:
+        """Clock reading for data fetched at `synced_at` (naive UTC); now when unknown"""
+        now = self._clock()
+        if synced_at is None:
+            return now
+        return now - max(0.0, (datetime.utcnow() - synced_at).total_seconds())
+
+    def _store(self, variant: Dict[str, Any], product_id: str, updated_at: Optional[float] = None) -> bool:
+        price = variant.get("price") or {}
+        if price.get("amount") is None:
+            return False
+        entry = VariantPrice(
+            float(price["amount"]),
+            price.get("currencyCode", "INR"),
+            bool(variant.get("availableForSale")),
+            product_id,
+            self._clock() if updated_at is None else updated_at
+        )
+        previous = self.variants.get(variant["id"])
+        if previous is not None and (previous.price, previous.currency) != (entry.price, entry.currency):
+            self.price_changes += 1
+        self.variants[variant["id"]] = entry
+        return True
+
+    def invalidate(self, item_id: str) -> None:
+        for variant_id in self.product_variants.pop(item_id, (item_id,)):
+            self.variants.pop(variant_id, None)
+
+    def lookup(self, item_id: str) -> Optional[VariantPrice]:
+        """Fresh entry for a variant id, or for a product id's first variant"""
+        variant_ids = self.product_variants.get(item_id)
+        entry = self.variants.get(variant_ids[0] if variant_ids else item_id)
+        if entry is None or self._clock() - entry.updated_at > self.max_age:
+            return None
+        return entry
+
+    def missing(self, item_ids: Iterable[str]) -> List[str]:
+        return [item_id for item_id in dict.fromkeys(item_ids) if self.lookup(item_id) is None]
+
+    def quote(self, items: Iterable[Tuple[str, int, float]], currency: str) -> Tuple[int, List[CartProblem]]:
+        """Recompute a cart total in paise from (item_id, quantity, client_price) lines"""
+        total = 0
+        problems: List[CartProblem] = []
+        for item_id, quantity, client_price in items:
+            entry = self.lookup(item_id)
+            if entry is None:
+                problems.append(CartProblem(item_id, "unknown item"))
+                continue
+            if quantity <= 0:
+                problems.append(CartProblem(item_id, "invalid quantity"))
+            if not entry.available:
+                problems.append(CartProblem(item_id, "not available for sale"))
+            if entry.currency != currency:
+                problems.append(CartProblem(item_id, f"priced in {entry.currency}"))
+            if to_paise(client_price) != to_paise(entry.price):
+                problems.append(CartProblem(item_id, f"price changed to {entry.price:.2f}"))
+            total += to_paise(entry.price) * quantity
+        return total, problems
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "variants": len(self.variants),
+            "products": len(self.product_variants),
+            "price_changes": self.price_changes
+        }
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry:
+    __slots__ = ("value", "expires_at", "stale_until")
+
+    def __init__(self, value: Any, expires_at: float, stale_until: float):
+        self.value = value
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+
+
+class TTLCache:
+    """Size-bounded LRU cache with per-key TTL and stale-while-revalidate
+
+    A fresh entry is returned as-is. An expired entry that is still inside its
+    stale window is returned immediately while a single background task reloads
+    it, so callers never wait on an upstream refresh. Anything older is a miss.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 60.0,
+        stale_ttl: float = 300.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._refreshing: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and self._clock() < entry.stale_until
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Return a fresh value without touching LRU order or counters"""
+        entry = self._entries.get(key)
+        if entry is None or self._clock() >= entry.expires_at:
+            return None
+        return entry.value
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return a fresh or stale value, or None on a miss"""
+        entry = self._entries.get(key)
+        now = self._clock()
+        if entry is None or now >= entry.stale_until:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        if now < entry.expires_at:
+            self.hits += 1
+        else:
+            self.stale_hits += 1
+        return entry.value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        now = self._clock()
+        self._entries[key] = CacheEntry(value, now + ttl, now + ttl + self.stale_ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one key, or everything when no key is given"""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None
+    ) -> Any:
+        """Serve `key` from cache, revalidating stale entries in the background"""
+        entry = self._entries.get(key)
+        now = self._clock()
+
+        if entry is not None and now < entry.expires_at:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry.value
+
+        if entry is not None and now < entry.stale_until:
+            self.stale_hits += 1
+            self._entries.move_to_end(key)
+            self._schedule_refresh(key, loader, ttl)
+            return entry.value
+
+        self.misses += 1
+        value = await loader()
+        self.set(key, value, ttl)
+        return value
+
+    def _schedule_refresh(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[float]
+    ) -> None:
+        if key in self._refreshing:
+            return
+
+        async def refresh():
+            try:
+                value = await loader()
+                self.set(key, value, ttl)
+                self.refreshes += 1
+            except Exception as e:
+                self.refresh_errors += 1
+                logger.warning(f"Background cache refresh failed for {key!r}: {e}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.create_task(refresh())
+
+    async def close(self) -> None:
+        """Cancel any in-flight background refreshes"""
+        tasks: Set[asyncio.Task] = set(self._refreshing.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._refreshing.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "in_flight_refreshes": len(self._refreshing),
+            "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0
+        }
@@ -0,0 +1,164 @@
+from functools import lru_cache
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple
+
+# GraphQL selection for each top-level product field; {images}/{variants} are page sizes
+FIELD_SELECTIONS = {
+    "id": "id",
+    "title": "title",
+    "handle": "handle",
+    "description": "description",
+    "vendor": "vendor",
+    "productType": "productType",
+    "tags": "tags",
+    "createdAt": "createdAt",
+    "updatedAt": "updatedAt",
+    "images": "images(first: {images}) {{ edges {{ node {{ {image_fields} }} }} }}",
+    "variants": "variants(first: {variants}) {{ edges {{ node {{ {variant_fields} }} }} }}",
+}
+
+CARD_IMAGE_FIELDS = ("url", "altText")
+FULL_IMAGE_FIELDS = ("id", "url", "altText", "width", "height")
+CARD_VARIANT_FIELDS = (
+    "id",
+    "price { amount currencyCode }",
+    "compareAtPrice { amount currencyCode }",
+    "availableForSale",
+)
+FULL_VARIANT_FIELDS = (
+    "id",
+    "title",
+    "price { amount currencyCode }",
+    "compareAtPrice { amount currencyCode }",
+    "availableForSale",
+    "quantityAvailable",
+    "selectedOptions { name value }",
+)
+
+
+class ProductSelection(NamedTuple):
+    fields: Tuple[str, ...]
+    images: int
+    variants: int
+    image_fields: Tuple[str, ...]
+    variant_fields: Tuple[str, ...]
+
+
+VIEWS = {
+    "card": ProductSelection(
+        ("id", "title", "handle", "images", "variants"),
+        1, 1, CARD_IMAGE_FIELDS, CARD_VARIANT_FIELDS
+    ),
+    "detail": ProductSelection(
+        ("id", "title", "handle", "description", "vendor", "productType", "tags", "images", "variants"),
+        5, 10, FULL_IMAGE_FIELDS, FULL_VARIANT_FIELDS
+    ),
+    "full": ProductSelection(
+        tuple(FIELD_SELECTIONS),
+        5, 10, FULL_IMAGE_FIELDS, FULL_VARIANT_FIELDS
+    ),
+}
+
+
+def resolve_selection(view: str = "full", fields: Optional[str] = None) -> ProductSelection:
+    """Selection for a named view, or for an explicit comma-separated field list"""
+    if not fields:
+        return VIEWS[view]
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in FIELD_SELECTIONS]
+    if unknown:
+        raise ValueError(f"Unknown product fields: {', '.join(unknown)}")
+    # Keep id so results can still be cached, merged and priced
+    ordered = tuple(field for field in FIELD_SELECTIONS if field in requested or field == "id")
+    base = VIEWS[view]
+    return base._replace(fields=ordered)
+
+
+@lru_cache(maxsize=64)
+def product_fields(selection: ProductSelection, indent: int = 20) -> str:
+    """GraphQL field list of a product node for a selection"""
+    return f"\n{' ' * indent}".join(
+        FIELD_SELECTIONS[field].format(
+            images=selection.images,
+            variants=selection.variants,
+            image_fields=" ".join(selection.image_fields),
+            variant_fields=" ".join(selection.variant_fields)
+        )
+        for field in selection.fields
+    )
+
+
+@lru_cache(maxsize=64)
+def build_products_query(selection: ProductSelection) -> str:
+    """GraphQL products query for a selection; cached per distinct selection"""
+    return f"""
+    query getProducts($first: Int!, $after: String, $query: String, $sortKey: ProductSortKeys!, $reverse: Boolean!) {{
+        products(first: $first, after: $after, query: $query, sortKey: $sortKey, reverse: $reverse) {{
+            edges {{
+                node {{
+                    {product_fields(selection)}
+                }}
+                cursor
+            }}
+            pageInfo {{
+                hasNextPage
+                hasPreviousPage
+                startCursor
+                endCursor
+            }}
+        }}
+    }}
+    """
+
+
+@lru_cache(maxsize=256)
+def build_batch_query(selection: ProductSelection, handles: int) -> str:
+    """One query for products/variants by id plus `handles` products by handle ($h0, $h1, ...)"""
+    fields = product_fields(selection, 12)
+    handle_params = "".join(f", $h{i}: String!" for i in range(handles))
+    handle_fields = "".join(
+        f"""
+        h{i}: product(handle: $h{i}) {{
+            {fields}
+        }}"""
+        for i in range(handles)
+    )
+    return f"""
+    query batchProducts($ids: [ID!]!{handle_params}) {{
+        nodes(ids: $ids) {{
+            ... on Product {{
+                {product_fields(selection, 16)}
+            }}
+            ... on ProductVariant {{
+                id
+                product {{
+                    {product_fields(selection, 20)}
+                }}
+            }}
+        }}{handle_fields}
+    }}
+    """
+
+
+def _field_name(selection: str) -> str:
+    return selection.split(" ", 1)[0]
+
+
+def _project_connection(connection: Any, limit: int, fields: Iterable[str]) -> Dict[str, Any]:
+    names = [_field_name(field) for field in fields]
+    edges = (connection or {}).get("edges", [])[:limit]
+    return {"edges": [{"node": {name: edge["node"].get(name) for name in names}} for edge in edges]}
+
+
+def project_product(product: Dict[str, Any], selection: ProductSelection) -> Dict[str, Any]:
+    """Trim a full Storefront-shaped product to a selection (mirror and index results)"""
+    if selection == VIEWS["full"]:
+        return product
+    projected = {}
+    for field in selection.fields:
+        if field == "images":
+            projected[field] = _project_connection(product.get(field), selection.images, selection.image_fields)
+        elif field == "variants":
+            projected[field] = _project_connection(product.get(field), selection.variants, selection.variant_fields)
+        else:
+            projected[field] = product.get(field)
+    return projected
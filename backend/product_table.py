@@ -0,0 +1,343 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+TABLE_SORT_KEYS = ("CREATED_AT", "UPDATED_AT", "TITLE", "PRICE")
+
+
+def _timestamp(value: Optional[str]) -> int:
+    if not value:
+        return 0
+    return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+
+
+def _price(value: Optional[float]) -> float:
+    return float(value) if value is not None else np.nan
+
+
+def _sizes(doc: Dict[str, Any]) -> List[str]:
+    sizes = []
+    for variant in doc.get("variants") or []:
+        for option in variant.get("selectedOptions") or []:
+            if (option.get("name") or "").lower() == "size" and option.get("value") not in sizes:
+                sizes.append(option["value"])
+    return sizes
+
+
+class CategoricalColumn:
+    """Single-valued string column stored as integer codes, with live counts per code"""
+
+    def __init__(self, capacity: int):
+        self.values: List[str] = []
+        self._codes_by_value: Dict[str, int] = {}
+        self.codes = np.full(capacity, -1, dtype=np.int32)
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def grow(self, extra: int) -> None:
+        self.codes = np.concatenate([self.codes, np.full(extra, -1, dtype=np.int32)])
+
+    def code(self, value: str) -> int:
+        code = self._codes_by_value.get(value)
+        if code is None:
+            code = self._codes_by_value[value] = len(self.values)
+            self.values.append(value)
+            self.counts = np.append(self.counts, 0)
+        return code
+
+    def set(self, row: int, value: Optional[str]) -> None:
+        old = self.codes[row]
+        if old >= 0:
+            self.counts[old] -= 1
+        new = self.code(value) if value else -1
+        self.codes[row] = new
+        if new >= 0:
+            self.counts[new] += 1
+
+    def count(self, mask: np.ndarray) -> np.ndarray:
+        codes = self.codes[:len(mask)][mask]
+        return np.bincount(codes[codes >= 0], minlength=len(self.values))
+
+    def select(self, value: str, n: int) -> np.ndarray:
+        code = self._codes_by_value.get(value, -2)
+        return self.codes[:n] == code
+
+
+class MultiValuedColumn:
+    """Multi-valued string column (tags, sizes) as (row, code) incidence pairs
+
+    Rewriting a row tombstones its old pairs and appends new ones; the pair
+    arrays are compacted once tombstones outnumber live pairs.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.values: List[str] = []
+        self._codes_by_value: Dict[str, int] = {}
+        self.rows = np.zeros(capacity, dtype=np.int64)
+        self.codes = np.zeros(capacity, dtype=np.int32)
+        self.live = np.zeros(capacity, dtype=bool)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self._row_pairs: Dict[int, List[int]] = {}
+        self._size = 0
+        self._dead = 0
+
+    def code(self, value: str) -> int:
+        code = self._codes_by_value.get(value)
+        if code is None:
+            code = self._codes_by_value[value] = len(self.values)
+            self.values.append(value)
+            self.counts = np.append(self.counts, 0)
+        return code
+
+    def set(self, row: int, values: Iterable[str]) -> None:
+        for pair in self._row_pairs.pop(row, ()):
+            self.live[pair] = False
+            self.counts[self.codes[pair]] -= 1
+            self._dead += 1
+        codes = [self.code(value) for value in dict.fromkeys(values) if value]
+        if not codes:
+            return
+        if self._size + len(codes) > len(self.rows):
+            self._resize(max(len(self.rows) * 2, self._size + len(codes)))
+        pairs = list(range(self._size, self._size + len(codes)))
+        self.rows[pairs] = row
+        self.codes[pairs] = codes
+        self.live[pairs] = True
+        np.add.at(self.counts, codes, 1)
+        self._row_pairs[row] = pairs
+        self._size += len(codes)
+        if self._dead > self._size - self._dead:
+            self._compact()
+
+    def _resize(self, capacity: int) -> None:
+        extra = capacity - len(self.rows)
+        self.rows = np.concatenate([self.rows, np.zeros(extra, dtype=np.int64)])
+        self.codes = np.concatenate([self.codes, np.zeros(extra, dtype=np.int32)])
+        self.live = np.concatenate([self.live, np.zeros(extra, dtype=bool)])
+
+    def _compact(self) -> None:
+        keep = np.flatnonzero(self.live[:self._size])
+        n = len(keep)
+        self.rows[:n] = self.rows[keep]
+        self.codes[:n] = self.codes[keep]
+        self.live[:n] = True
+        self.live[n:] = False
+        self._size = n
+        self._dead = 0
+        self._row_pairs = {}
+        for pair, row in enumerate(self.rows[:n].tolist()):
+            self._row_pairs.setdefault(row, []).append(pair)
+
+    def count(self, mask: np.ndarray) -> np.ndarray:
+        n = self._size
+        selected = self.live[:n] & mask[self.rows[:n]]
+        return np.bincount(self.codes[:n][selected], minlength=len(self.values))
+
+    def select(self, value: str, n: int) -> np.ndarray:
+        mask = np.zeros(n, dtype=bool)
+        code = self._codes_by_value.get(value)
+        if code is not None:
+            pairs = self.live[:self._size] & (self.codes[:self._size] == code)
+            mask[self.rows[:self._size][pairs]] = True
+        return mask
+
+
+class ProductTable:
+    """Columnar view of the catalog for vectorized filtering and sorting
+
+    One row per product: min/max variant price, created/updated timestamps,
+    an availability mask, a bitset of collection memberships (one bit per
+    collection handle, packed into uint64 words) and facet columns (vendor,
+    product type, tags, sizes). Upserts overwrite a row in
+    place and removals free it for reuse, so catalog syncs update the table
+    incrementally. Each sort order is computed once per table version and
+    reused, so a page query is a mask over a presorted row index.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.rows: Dict[str, int] = {}
+        self.ids: List[Optional[str]] = [None] * capacity
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self._free: List[int] = []
+        self._size = 0
+        self.min_price = np.full(capacity, np.nan)
+        self.max_price = np.full(capacity, np.nan)
+        self.created_at = np.zeros(capacity, dtype=np.int64)
+        self.updated_at = np.zeros(capacity, dtype=np.int64)
+        self.available = np.zeros(capacity, dtype=bool)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.collection_bits = np.zeros((capacity, 1), dtype=np.uint64)
+        self.collections: Dict[str, int] = {}
+        self.titles: List[str] = [""] * capacity
+        self.title_rank = np.zeros(capacity, dtype=np.int64)
+        self._titles_dirty = False
+        self._orders: Dict[Tuple[str, bool], Tuple[int, np.ndarray]] = {}
+        self.vendor = CategoricalColumn(capacity)
+        self.product_type = CategoricalColumn(capacity)
+        self.tags = MultiValuedColumn(capacity * 4)
+        self.sizes = MultiValuedColumn(capacity * 4)
+        self.ready = False
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def row_count(self) -> int:
+        """Allocated rows, including freed ones; the length of every mask"""
+        return self._size
+
+    def _grow(self, capacity: int) -> None:
+        extra = capacity - len(self.ids)
+        self.ids.extend([None] * extra)
+        self.titles.extend([""] * extra)
+        self.min_price = np.concatenate([self.min_price, np.full(extra, np.nan)])
+        self.max_price = np.concatenate([self.max_price, np.full(extra, np.nan)])
+        self.created_at = np.concatenate([self.created_at, np.zeros(extra, dtype=np.int64)])
+        self.updated_at = np.concatenate([self.updated_at, np.zeros(extra, dtype=np.int64)])
+        self.available = np.concatenate([self.available, np.zeros(extra, dtype=bool)])
+        self.alive = np.concatenate([self.alive, np.zeros(extra, dtype=bool)])
+        self.title_rank = np.concatenate([self.title_rank, np.zeros(extra, dtype=np.int64)])
+        self.vendor.grow(extra)
+        self.product_type.grow(extra)
+        self.collection_bits = np.vstack([
+            self.collection_bits,
+            np.zeros((extra, self.collection_bits.shape[1]), dtype=np.uint64)
+        ])
+
+    def _collection_bit(self, handle: str) -> Tuple[int, np.uint64]:
+        index = self.collections.get(handle)
+        if index is None:
+            index = self.collections[handle] = len(self.collections)
+            if index // 64 >= self.collection_bits.shape[1]:
+                words = np.zeros((len(self.ids), 1), dtype=np.uint64)
+                self.collection_bits = np.hstack([self.collection_bits, words])
+        return index // 64, np.uint64(1) << np.uint64(index % 64)
+
+    def upsert(self, doc: Dict[str, Any]) -> None:
+        product_id = doc["_id"]
+        row = self.rows.get(product_id)
+        if row is None:
+            if self._free:
+                row = self._free.pop()
+            else:
+                if self._size == len(self.ids):
+                    self._grow(len(self.ids) * 2)
+                row = self._size
+                self._size += 1
+            self.rows[product_id] = row
+            self.ids[row] = product_id
+
+        title = (doc.get("title") or "").lower()
+        if self.titles[row] != title or not self.alive[row]:
+            self._titles_dirty = True
+        self.titles[row] = title
+        self.documents[product_id] = doc
+        self.min_price[row] = _price(doc.get("min_price"))
+        self.max_price[row] = _price(doc.get("max_price"))
+        self.created_at[row] = _timestamp(doc.get("createdAt"))
+        self.updated_at[row] = _timestamp(doc.get("updatedAt"))
+        self.available[row] = bool(doc.get("available"))
+        self.alive[row] = True
+        self.collection_bits[row] = 0
+        for handle in doc.get("collections") or []:
+            word, bit = self._collection_bit(handle)
+            self.collection_bits[row, word] |= bit
+        self.vendor.set(row, doc.get("vendor"))
+        self.product_type.set(row, doc.get("productType"))
+        self.tags.set(row, doc.get("tags") or [])
+        self.sizes.set(row, _sizes(doc))
+        self.version += 1
+
+    def upsert_many(self, docs: Iterable[Dict[str, Any]]) -> None:
+        for doc in docs:
+            self.upsert(doc)
+
+    def remove(self, product_id: str) -> None:
+        row = self.rows.pop(product_id, None)
+        if row is None:
+            return
+        self.documents.pop(product_id, None)
+        self.ids[row] = None
+        self.alive[row] = False
+        self.vendor.set(row, None)
+        self.product_type.set(row, None)
+        self.tags.set(row, [])
+        self.sizes.set(row, [])
+        self._free.append(row)
+        self.version += 1
+
+    def _title_ranks(self) -> np.ndarray:
+        if self._titles_dirty:
+            order = sorted(range(self._size), key=self.titles.__getitem__)
+            self.title_rank[np.array(order, dtype=np.int64)] = np.arange(len(order))
+            self._titles_dirty = False
+        return self.title_rank[:self._size]
+
+    def mask(
+        self,
+        collection_handle: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        available: Optional[bool] = None
+    ) -> np.ndarray:
+        """Boolean row mask for the given filters (price filters overlap the variant price range)"""
+        n = self._size
+        mask = self.alive[:n].copy()
+        if collection_handle is not None:
+            index = self.collections.get(collection_handle)
+            if index is None:
+                return np.zeros(n, dtype=bool)
+            bit = np.uint64(1) << np.uint64(index % 64)
+            mask &= (self.collection_bits[:n, index // 64] & bit) != 0
+        # NaN prices compare False, so unpriced products drop out of price filters
+        if min_price is not None:
+            mask &= self.max_price[:n] >= min_price
+        if max_price is not None:
+            mask &= self.min_price[:n] <= max_price
+        if available is not None:
+            mask &= self.available[:n] == available
+        return mask
+
+    def sort_column(self, sort_key: str) -> np.ndarray:
+        n = self._size
+        if sort_key == "PRICE":
+            return np.nan_to_num(self.min_price[:n], nan=0.0)
+        if sort_key == "UPDATED_AT":
+            return self.updated_at[:n]
+        if sort_key == "TITLE":
+            return self._title_ranks()
+        return self.created_at[:n]
+
+    def sorted_rows(self, sort_key: str, reverse: bool = False) -> np.ndarray:
+        """Row order for a sort, cached until the table changes"""
+        cached = self._orders.get((sort_key, reverse))
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        keys = self.sort_column(sort_key)
+        # Stable sort keeps ascending row order among equal keys, so pages never overlap
+        order = np.argsort(-keys if reverse else keys, kind="stable")
+        self._orders[(sort_key, reverse)] = (self.version, order)
+        return order
+
+    def query(
+        self,
+        sort_key: str,
+        reverse: bool = False,
+        offset: int = 0,
+        limit: int = 20,
+        **filters: Any
+    ) -> Tuple[List[str], int]:
+        """Product ids for one page of the filtered, sorted table, and the total match count"""
+        order = self.sorted_rows(sort_key, reverse)
+        rows = order[self.mask(**filters)[order]]
+        return [self.ids[row] for row in rows[offset:offset + limit]], len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "products": len(self.rows),
+            "capacity": len(self.ids),
+            "collections": len(self.collections),
+            "ready": self.ready,
+            "version": self.version
+        }
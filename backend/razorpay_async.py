@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import random
+from typing import Any, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+RAZORPAY_API_BASE_URL = "https://api.razorpay.com/v1"
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Errors raised before the request reached Razorpay; safe to retry even for POSTs
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class RazorpayError(Exception):
+    def __init__(self, status_code: int, error: Any):
+        self.status_code = status_code
+        self.error = error
+        super().__init__(f"Razorpay API error {status_code}: {error}")
+
+
+class AsyncRazorpayClient:
+    """Non-blocking Razorpay REST client on a pooled httpx.AsyncClient
+
+    GET requests are retried on transport errors, 429 and 5xx responses with
+    full-jitter exponential backoff. POST requests (order creation) are only
+    retried when the request never reached Razorpay or was rate limited, so a
+    retry can never create a second order.
+
+    `base_url` can point at a local stand-in (see razorpay_standin.py).
+    """
+
+    def __init__(
+        self,
+        key_id: str,
+        key_secret: str,
+        base_url: str = RAZORPAY_API_BASE_URL,
+        max_retries: int = 3,
+        backoff_base: float = 0.2,
+        backoff_max: float = 2.0,
+        timeout: Optional[httpx.Timeout] = None,
+        limits: Optional[httpx.Limits] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retries = 0
+        self._http = httpx.AsyncClient(
+            base_url=base_url,
+            auth=(key_id, key_secret),
+            timeout=timeout or httpx.Timeout(10.0, connect=5.0),
+            limits=limits or httpx.Limits(max_connections=50, max_keepalive_connections=10),
+            transport=transport
+        )
+
+    async def close(self) -> None:
+        await self._http.aclose()
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def _request(self, method: str, path: str, **kwargs) -> Dict[str, Any]:
+        idempotent = method == "GET"
+        attempt = 0
+        while True:
+            try:
+                response = await self._http.request(method, path, **kwargs)
+            except httpx.TransportError as e:
+                retryable = idempotent or isinstance(e, UNSENT_ERRORS)
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                logger.warning(f"Razorpay {method} {path} failed ({e!r}), retrying")
+            else:
+                retryable = response.status_code == 429 or (
+                    idempotent and response.status_code in RETRYABLE_STATUS_CODES
+                )
+                if response.status_code < 400:
+                    return response.json()
+                if not retryable or attempt >= self.max_retries:
+                    try:
+                        error = response.json().get("error", response.text)
+                    except ValueError:
+                        error = response.text
+                    raise RazorpayError(response.status_code, error)
+                logger.warning(f"Razorpay {method} {path} returned {response.status_code}, retrying")
+
+            self.retries += 1
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+    async def create_order(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._request("POST", "/orders", json=data)
+
+    async def fetch_order(self, order_id: str) -> Dict[str, Any]:
+        return await self._request("GET", f"/orders/{order_id}")
+
+    async def fetch_payment(self, payment_id: str) -> Dict[str, Any]:
+        return await self._request("GET", f"/payments/{payment_id}")
+
+    async def list_payments(
+        self,
+        from_ts: Optional[int] = None,
+        to_ts: Optional[int] = None,
+        count: int = 100,
+        skip: int = 0
+    ) -> Dict[str, Any]:
+        """One page of payments; `count` is capped at 100 by Razorpay"""
+        params: Dict[str, Any] = {"count": count, "skip": skip}
+        if from_ts is not None:
+            params["from"] = from_ts
+        if to_ts is not None:
+            params["to"] = to_ts
+        return await self._request("GET", "/payments", params=params)
@@ -0,0 +1,113 @@
+"""Local stand-in for the Razorpay REST API
+
+Run with `uvicorn razorpay_standin:app --port 9001` and point the backend at it
+with RAZORPAY_API_BASE_URL=http://localhost:9001/v1. STANDIN_LATENCY_MS and
+STANDIN_ERROR_RATE inject delay and random 503s for load tests.
+"""
+import asyncio
+import os
+import random
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+LATENCY_MS = float(os.getenv("STANDIN_LATENCY_MS", 0))
+ERROR_RATE = float(os.getenv("STANDIN_ERROR_RATE", 0))
+
+app = FastAPI(title="Razorpay stand-in")
+router = APIRouter(prefix="/v1")
+
+orders: Dict[str, Dict[str, Any]] = {}
+payments: Dict[str, Dict[str, Any]] = {}
+
+
+class StandinPaymentRequest(BaseModel):
+    order_id: str
+    status: str = "captured"
+    payment_id: Optional[str] = None
+
+
+@app.middleware("http")
+async def simulate_network(request, call_next):
+    if LATENCY_MS:
+        await asyncio.sleep(LATENCY_MS / 1000)
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        return JSONResponse(status_code=503, content={"error": {"code": "SERVER_ERROR"}})
+    return await call_next(request)
+
+
+@router.post("/orders")
+async def create_order(data: Dict[str, Any]):
+    order_id = f"order_{uuid.uuid4().hex[:14]}"
+    order = {
+        "id": order_id,
+        "entity": "order",
+        "amount": data["amount"],
+        "currency": data.get("currency", "INR"),
+        "receipt": data.get("receipt"),
+        "status": "created",
+        "created_at": int(time.time())
+    }
+    orders[order_id] = order
+    return order
+
+
+@router.get("/orders/{order_id}")
+async def fetch_order(order_id: str):
+    if order_id not in orders:
+        raise HTTPException(status_code=404, detail={"code": "BAD_REQUEST_ERROR"})
+    return orders[order_id]
+
+
+@router.get("/payments/{payment_id}")
+async def fetch_payment(payment_id: str):
+    if payment_id not in payments:
+        raise HTTPException(status_code=404, detail={"code": "BAD_REQUEST_ERROR"})
+    return payments[payment_id]
+
+
+@router.get("/payments")
+async def list_payments(
+    count: int = Query(10, le=100),
+    skip: int = 0,
+    from_ts: Optional[int] = Query(None, alias="from"),
+    to_ts: Optional[int] = Query(None, alias="to")
+):
+    items = sorted(payments.values(), key=lambda p: p["created_at"], reverse=True)
+    if from_ts is not None:
+        items = [p for p in items if p["created_at"] >= from_ts]
+    if to_ts is not None:
+        items = [p for p in items if p["created_at"] <= to_ts]
+    page = items[skip:skip + count]
+    return {"entity": "collection", "count": len(page), "items": page}
+
+
+@router.post("/_standin/payments")
+async def create_payment(request: StandinPaymentRequest):
+    """Simulate a customer paying (or failing to pay) an order"""
+    order = orders.get(request.order_id)
+    if order is None:
+        raise HTTPException(status_code=404, detail="Unknown order")
+    payment_id = request.payment_id or f"pay_{uuid.uuid4().hex[:14]}"
+    payment = {
+        "id": payment_id,
+        "entity": "payment",
+        "amount": order["amount"],
+        "currency": order["currency"],
+        "status": request.status,
+        "order_id": order["id"],
+        "method": "upi",
+        "captured": request.status == "captured",
+        "created_at": int(time.time())
+    }
+    payments[payment_id] = payment
+    if request.status == "captured":
+        order["status"] = "paid"
+    return payment
+
+
+app.include_router(router)
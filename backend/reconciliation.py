@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from payment_events import order_transition
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Space calls at least 1/rate seconds apart"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            if self._next > now:
+                await asyncio.sleep(self._next - now)
+                now = self._next
+            self._next = now + self.interval
+
+
+def _unix(value: datetime) -> int:
+    return int(value.replace(tzinfo=timezone.utc).timestamp())
+
+
+class PaymentReconciler:
+    """Resolve orders stuck in `created` from Razorpay's payments list
+
+    Rather than one payment fetch per order, a run lists every payment in the
+    time window covering the stale orders (100 per call, paced by
+    `max_requests_per_second`) and matches them by order id. Stale orders are
+    walked oldest first in batches of `batch_size`; each batch only lists
+    payments made up to `payment_window` after its newest order, so the page
+    cap cannot starve the oldest orders behind recent traffic. Updates go out
+    as one bulk_write per batch using the same forward-only transitions as the
+    webhook processor, so the two never fight.
+    """
+
+    def __init__(
+        self,
+        db,
+        razorpay: Callable[[], Any],
+        min_age: timedelta = timedelta(minutes=15),
+        lookback: timedelta = timedelta(days=3),
+        batch_size: int = 1000,
+        max_pages: int = 50,
+        max_requests_per_second: float = 2.0,
+        payment_window: timedelta = timedelta(hours=24)
+    ):
+        self.db = db
+        self.razorpay = razorpay
+        self.min_age = min_age
+        self.lookback = lookback
+        self.batch_size = batch_size
+        self.max_pages = max_pages
+        self.payment_window = payment_window
+        self.limiter = RateLimiter(max_requests_per_second)
+        self._lock = asyncio.Lock()
+        self.runs = 0
+        self.orders_scanned = 0
+        self.api_calls = 0
+        self.payments_fetched = 0
+        self.marked_paid = 0
+        self.failed_attempts = 0
+        self.unresolved = 0
+        self.page_cap_hits = 0
+        self.errors = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    async def stale_orders(self, now: datetime, after: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Next batch of stale orders, oldest first, keyset-paged past `after`"""
+        conditions: List[Dict[str, Any]] = [
+            {"status": "created", "created_at": {"$gte": now - self.lookback, "$lt": now - self.min_age}}
+        ]
+        if after is not None:
+            conditions.append({"$or": [
+                {"created_at": {"$gt": after["created_at"]}},
+                {"created_at": after["created_at"], "_id": {"$gt": after["_id"]}}
+            ]})
+        return await self.db.orders.find(
+            {"$and": conditions},
+            {"razorpay_order_id": 1, "created_at": 1}
+        ).sort([("created_at", 1), ("_id", 1)]).limit(self.batch_size).to_list(self.batch_size)
+
+    async def fetch_payments(self, from_ts: int, to_ts: int, wanted: set) -> Tuple[Dict[str, List[Dict[str, Any]]], bool]:
+        """Page through the payments list, keeping those for `wanted` orders
+
+        The flag is True when `max_pages` ran out before the window did.
+        """
+        by_order: Dict[str, List[Dict[str, Any]]] = {}
+        client = self.razorpay()
+        for page in range(self.max_pages):
+            await self.limiter.acquire()
+            result = await client.list_payments(from_ts=from_ts, to_ts=to_ts, count=100, skip=page * 100)
+            self.api_calls += 1
+            items = result.get("items", [])
+            self.payments_fetched += len(items)
+            for payment in items:
+                if payment.get("order_id") in wanted:
+                    by_order.setdefault(payment["order_id"], []).append(payment)
+            if len(items) < 100:
+                return by_order, False
+        return by_order, True
+
+    async def run(self) -> Dict[str, Any]:
+        async with self._lock:
+            started = time.monotonic()
+            now = datetime.utcnow()
+            stats = {"orders": 0, "batches": 0, "api_calls": 0, "paid": 0, "failed_attempts": 0, "unresolved": 0,
+                     "page_cap_hits": 0}
+            calls_before = self.api_calls
+            after = None
+            while True:
+                orders = await self.stale_orders(now, after)
+                if not orders:
+                    break
+                await self._reconcile_batch(orders, now, stats)
+                stats["orders"] += len(orders)
+                stats["batches"] += 1
+                if len(orders) < self.batch_size:
+                    break
+                after = orders[-1]
+            stats["api_calls"] = self.api_calls - calls_before
+
+            self.runs += 1
+            self.orders_scanned += stats["orders"]
+            self.marked_paid += stats["paid"]
+            self.failed_attempts += stats["failed_attempts"]
+            self.unresolved += stats["unresolved"]
+            self.page_cap_hits += stats["page_cap_hits"]
+            stats["duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+            stats["finished_at"] = datetime.utcnow()
+            self.last_run = stats
+            return stats
+
+    async def _reconcile_batch(self, orders: List[Dict[str, Any]], now: datetime, stats: Dict[str, Any]) -> None:
+        oldest, newest = orders[0]["created_at"], orders[-1]["created_at"]
+        wanted = {order["razorpay_order_id"] for order in orders}
+        payments, capped = await self.fetch_payments(
+            _unix(oldest) - 60, _unix(min(now, newest + self.payment_window)), wanted
+        )
+
+        operations = []
+        unresolved = 0
+        for order_id in wanted:
+            attempts = payments.get(order_id, [])
+            captured = next((p for p in attempts if p.get("status") == "captured"), None)
+            if captured:
+                kind, payment = "payment.captured", captured
+                stats["paid"] += 1
+            elif attempts and all(p.get("status") == "failed" for p in attempts):
+                # Not final: the shopper may still retry on this order, so it
+                # stays created and is checked again on the next run
+                kind, payment = "payment.failed", attempts[0]
+                stats["failed_attempts"] += 1
+            else:
+                unresolved += 1
+                continue
+            transition = order_transition({"event": kind, "payload": {"payment": {"entity": payment}}})
+            operations.append(UpdateOne(transition["filter"], transition["update"]))
+        stats["unresolved"] += unresolved
+
+        if capped:
+            stats["page_cap_hits"] += 1
+            logger.warning(
+                f"Payment reconciliation hit the {self.max_pages}-page cap for orders created "
+                f"{oldest} to {newest}; {unresolved} of them may have unlisted payments"
+            )
+
+        if operations:
+            await self.db.orders.bulk_write(operations, ordered=False)
+
+    async def run_forever(self, interval: float) -> None:
+        while True:
+            try:
+                await self.run()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Payment reconciliation failed: {e}")
+            await asyncio.sleep(interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "runs": self.runs,
+            "orders_scanned": self.orders_scanned,
+            "api_calls": self.api_calls,
+            "payments_fetched": self.payments_fetched,
+            "marked_paid": self.marked_paid,
+            "failed_attempts": self.failed_attempts,
+            "unresolved": self.unresolved,
+            "page_cap_hits": self.page_cap_hits,
+            "errors": self.errors,
+            "last_run": self.last_run
+        }
@@ -0,0 +1,113 @@
+"""Replay signed Razorpay webhook events against a running backend
+
+Examples (from backend/):
+
+    # 10k synthetic events for 2k orders, 20% redelivered, shuffled
+    python replay_webhooks.py --generate 2000 --duplicates 0.2 --shuffle
+
+    # Replay captured events, one JSON event per line
+    python replay_webhooks.py --file events.ndjson --url http://localhost:8001/api/razorpay/webhook
+
+The secret defaults to RAZORPAY_WEBHOOK_SECRET from the environment/.env.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import httpx
+from dotenv import load_dotenv
+
+from payment_events import sign_webhook_body
+
+load_dotenv(Path(__file__).parent / ".env")
+
+
+def synthetic_events(orders: int) -> List[Tuple[str, Dict[str, Any]]]:
+    """A failed attempt, a capture and an order.paid for each order"""
+    events = []
+    now = int(time.time())
+    for i in range(orders):
+        order_id = f"order_replay{i:08d}"
+        failed = {"id": f"pay_fail{i:08d}", "order_id": order_id, "status": "failed",
+                  "amount": 49900, "error_description": "Payment declined"}
+        captured = {"id": f"pay_ok{i:08d}", "order_id": order_id, "status": "captured", "amount": 49900}
+        order = {"id": order_id, "status": "paid", "amount": 49900}
+        for kind, payload in (
+            ("payment.failed", {"payment": {"entity": failed}}),
+            ("payment.captured", {"payment": {"entity": captured}}),
+            ("order.paid", {"payment": {"entity": captured}, "order": {"entity": order}}),
+        ):
+            events.append((f"evt_{uuid.uuid4().hex[:14]}", {
+                "entity": "event", "event": kind, "contains": list(payload),
+                "payload": payload, "created_at": now
+            }))
+    return events
+
+
+def load_events(path: str) -> List[Tuple[str, Dict[str, Any]]]:
+    events = []
+    with open(path) as handle:
+        for line in handle:
+            if line.strip():
+                event = json.loads(line)
+                events.append((event.pop("_event_id", None) or f"evt_{uuid.uuid4().hex[:14]}", event))
+    return events
+
+
+async def replay(url: str, secret: str, events: List[Tuple[str, Dict[str, Any]]], concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses: Dict[int, int] = {}
+    latencies: List[float] = []
+
+    async with httpx.AsyncClient(timeout=30.0, limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def send(event_id: str, event: Dict[str, Any]):
+            body = json.dumps(event).encode()
+            headers = {
+                "Content-Type": "application/json",
+                "X-Razorpay-Signature": sign_webhook_body(body, secret),
+                "X-Razorpay-Event-Id": event_id
+            }
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(url, content=body, headers=headers)
+                latencies.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(send(event_id, event) for event_id, event in events))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"sent {len(events)} events in {elapsed:.2f}s ({len(events) / elapsed:.0f}/s)")
+    print(f"status codes: {statuses}")
+    print(f"ack latency ms: p50={latencies[len(latencies) // 2]:.1f} "
+          f"p99={latencies[int(len(latencies) * 0.99) - 1]:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8001/api/razorpay/webhook")
+    parser.add_argument("--secret", default=os.getenv("RAZORPAY_WEBHOOK_SECRET", ""))
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file", help="NDJSON file of webhook events")
+    source.add_argument("--generate", type=int, metavar="ORDERS", help="synthesize events for N orders")
+    parser.add_argument("--duplicates", type=float, default=0.0, help="fraction of events delivered twice")
+    parser.add_argument("--shuffle", action="store_true", help="deliver out of order")
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    events = load_events(args.file) if args.file else synthetic_events(args.generate)
+    events += random.sample(events, int(len(events) * args.duplicates))
+    if args.shuffle:
+        random.shuffle(events)
+    asyncio.run(replay(args.url, args.secret, events, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import heapq
+import math
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+TOKEN_RE = re.compile(r"[0-9a-z]+")
+
+# Spelling variants of common Indian fashion terms -> canonical token
+CANONICAL_TERMS = {
+    "sari": "saree", "saris": "saree", "sarees": "saree", "sarie": "saree", "saaree": "saree",
+    "kurtas": "kurta", "kurtha": "kurta", "kurthas": "kurta",
+    "kurtis": "kurti", "kurthi": "kurti", "kurthis": "kurti",
+    "lehengas": "lehenga", "lehnga": "lehenga", "lahenga": "lehenga", "lengha": "lehenga",
+    "dupattas": "dupatta", "duppatta": "dupatta", "dupata": "dupatta",
+    "salwars": "salwar", "shalwar": "salwar", "salvar": "salwar",
+    "anarkalis": "anarkali", "churidars": "churidar", "sherwanis": "sherwani",
+    "benarasi": "banarasi", "banarsi": "banarasi",
+}
+
+# Terms close enough that a query for one should also surface the other
+RELATED_TERMS = {
+    "kurta": ("kurti",),
+    "kurti": ("kurta",),
+}
+RELATED_WEIGHT = 0.5
+
+# Field boosts for BM25F-style weighted term frequency
+FIELD_WEIGHTS = {
+    "title": 3.0,
+    "tags": 2.0,
+    "productType": 2.0,
+    "vendor": 1.5,
+    "description": 1.0,
+}
+
+
+def normalize_token(token: str) -> str:
+    if token in CANONICAL_TERMS:
+        return CANONICAL_TERMS[token]
+    # Light plural folding for everything else ("dresses" -> "dress", "tops" -> "top")
+    if len(token) > 4 and token.endswith("es") and token[-3] in "sxz":
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase, split on anything that is not a letter or digit and normalize"""
+    if not text:
+        return []
+    return [normalize_token(token) for token in TOKEN_RE.findall(text.lower())]
+
+
+class SearchIndex:
+    """In-memory inverted index over catalog documents with BM25 ranking
+
+    Documents are the normalized catalog documents produced by catalog_sync.
+    `upsert` and `remove` keep postings current without a rebuild; the sorted
+    vocabulary used for prefix matching of the last query term is rebuilt
+    lazily on the next search after a change.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self.handle_ids: Dict[str, str] = {}
+        self.doc_lengths: Dict[str, float] = {}
+        self._doc_terms: Dict[str, Tuple[str, ...]] = {}
+        self._total_length = 0.0
+        self._vocabulary: List[str] = []
+        self._vocabulary_dirty = False
+        self._norms: Dict[str, float] = {}
+        self._norms_dirty = False
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def _weighted_terms(self, doc: Dict[str, Any]) -> Dict[str, float]:
+        weights: Dict[str, float] = defaultdict(float)
+        for field, boost in FIELD_WEIGHTS.items():
+            value = doc.get(field)
+            if isinstance(value, list):
+                value = " ".join(value)
+            for token in tokenize(value):
+                weights[token] += boost
+        return weights
+
+    def upsert(self, doc: Dict[str, Any]) -> None:
+        doc_id = doc["_id"]
+        self.remove(doc_id)
+        weights = self._weighted_terms(doc)
+        for term, weight in weights.items():
+            self.postings[term][doc_id] = weight
+        length = sum(weights.values())
+        self.documents[doc_id] = doc
+        if doc.get("handle"):
+            self.handle_ids[doc["handle"]] = doc_id
+        self.doc_lengths[doc_id] = length
+        self._doc_terms[doc_id] = tuple(weights)
+        self._total_length += length
+        self._vocabulary_dirty = True
+        self._norms_dirty = True
+
+    def upsert_many(self, docs: Iterable[Dict[str, Any]]) -> None:
+        for doc in docs:
+            self.upsert(doc)
+
+    def remove(self, doc_id: str) -> None:
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[term]
+        self._total_length -= self.doc_lengths.pop(doc_id, 0.0)
+        doc = self.documents.pop(doc_id, None)
+        if doc is not None and self.handle_ids.get(doc.get("handle")) == doc_id:
+            del self.handle_ids[doc["handle"]]
+        self._vocabulary_dirty = True
+        self._norms_dirty = True
+
+    def _length_norms(self) -> Dict[str, float]:
+        """Per-document BM25 length normalization, recomputed after changes"""
+        if self._norms_dirty:
+            avg_length = (self._total_length / len(self.documents) if self.documents else 0.0) or 1.0
+            k1, b = self.k1, self.b
+            self._norms = {
+                doc_id: k1 * (1 - b + b * length / avg_length)
+                for doc_id, length in self.doc_lengths.items()
+            }
+            self._norms_dirty = False
+        return self._norms
+
+    def _prefix_terms(self, prefix: str, limit: int = 20) -> List[str]:
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self.postings)
+            self._vocabulary_dirty = False
+        start = bisect_left(self._vocabulary, prefix)
+        matches = []
+        for term in self._vocabulary[start:start + limit]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        return matches
+
+    def _query_terms(self, query: str) -> Dict[str, float]:
+        raw = TOKEN_RE.findall(query.lower())
+        terms: Dict[str, float] = {}
+        for position, token in enumerate(raw):
+            term = normalize_token(token)
+            terms[term] = max(terms.get(term, 0.0), 1.0)
+            for related in RELATED_TERMS.get(term, ()):
+                terms.setdefault(related, RELATED_WEIGHT)
+            # Treat the last term as a prefix so partially typed words still match
+            if position == len(raw) - 1 and term not in self.postings:
+                for expanded in self._prefix_terms(token):
+                    terms.setdefault(expanded, RELATED_WEIGHT)
+        return terms
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Return (doc_id, score) pairs best first; all matches unless `limit` is given"""
+        n_docs = len(self.documents)
+        if not n_docs:
+            return []
+        norms = self._length_norms()
+        k1_plus_1 = self.k1 + 1
+        scores: Dict[str, float] = {}
+
+        for term, query_weight in self._query_terms(query).items():
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            boost = query_weight * idf * k1_plus_1
+            for doc_id, tf in postings.items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + boost * tf / (tf + norms[doc_id])
+
+        rank = lambda item: (-item[1], item[0])
+        if limit is not None:
+            return heapq.nsmallest(limit, scores.items(), key=rank)
+        return sorted(scores.items(), key=rank)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "documents": len(self.documents),
+            "terms": len(self.postings),
+        }
@@ -0,0 +1,82 @@
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict
+
+from pymongo import UpdateOne
+
+from suggest import normalize_text
+
+MAX_TERM_LENGTH = 100
+
+
+class SearchPopularity:
+    """How often each search term was used, for weighting autocomplete
+
+    Searches are counted in memory and flushed as `$inc` upserts, so every
+    worker adds to the same totals and they survive restarts. `refresh`
+    flushes, then reloads the top `max_terms` shared totals into `counts`.
+    Without a collection the counts stay in this process.
+    """
+
+    def __init__(self, collection=None, max_terms: int = 10000):
+        self.collection = collection
+        self.max_terms = max_terms
+        self.counts: Dict[str, int] = {}
+        self._pending: Counter = Counter()
+        self.recorded = 0
+        self.dropped = 0
+        self.flushed = 0
+
+    def record(self, search_query: str) -> None:
+        term = normalize_text(search_query)
+        if not term or len(term) > MAX_TERM_LENGTH:
+            return
+        if term not in self._pending and len(self._pending) >= self.max_terms:
+            self.dropped += 1
+            return
+        self._pending[term] += 1
+        self.recorded += 1
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, Counter()
+        if self.collection is None:
+            merged = Counter(self.counts)
+            merged.update(pending)
+            self.counts = dict(merged.most_common(self.max_terms))
+            return
+
+        now = datetime.utcnow()
+        try:
+            await self.collection.bulk_write([
+                UpdateOne({"_id": term}, {"$inc": {"count": count}, "$set": {"last_searched_at": now}}, upsert=True)
+                for term, count in pending.items()
+            ], ordered=False)
+        except Exception:
+            # Keep the counts for the next flush
+            self._pending.update(pending)
+            raise
+        self.flushed += len(pending)
+
+    async def refresh(self) -> bool:
+        """Flush, then reload the shared totals; True when `counts` changed"""
+        previous = self.counts
+        await self.flush()
+        if self.collection is not None:
+            docs = await self.collection.find({}, {"count": 1}) \
+                .sort("count", -1) \
+                .limit(self.max_terms) \
+                .to_list(self.max_terms)
+            self.counts = {doc["_id"]: doc["count"] for doc in docs}
+        return self.counts != previous
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "terms": len(self.counts),
+            "pending": len(self._pending),
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "flushed": self.flushed,
+            "persistent": self.collection is not None
+        }
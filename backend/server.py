@@ -1,6 +1,7 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Query
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Header, Depends, Response, Request
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
@@ -8,149 +9,41 @@ from pathlib import Path
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 import httpx
 from pydantic_settings import BaseSettings
-import razorpay
 import hmac
 import hashlib
 import json
-
-
-# Add these imports at the top if not already there
-import razorpay
-import hmac
-import hashlib
-
-# Add this after your existing settings
-razorpay_client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
-
-# Add these models after your existing models
-class CartItem(BaseModel):
-    id: str
-    title: str
-    quantity: int
-    price: float
-    handle: str
-
-class CreateOrderRequest(BaseModel):
-    amount: int  # Amount in paise
-    currency: str = "INR"
-    cart: List[CartItem]
-
-class VerifyPaymentRequest(BaseModel):
-    razorpay_order_id: str
-    razorpay_payment_id: str
-    razorpay_signature: str
-    cart: List[CartItem]
-
-# Add these endpoints after your existing endpoints
-@api_router.post("/create-razorpay-order")
-async def create_razorpay_order(request: CreateOrderRequest):
-    """Create Razorpay order for payment"""
-    try:
-        # Create order in Razorpay
-        order_data = {
-            "amount": request.amount,
-            "currency": request.currency,
-            "receipt": f"order_{uuid.uuid4()}",
-            "payment_capture": 1
-        }
-        
-        razorpay_order = razorpay_client.order.create(data=order_data)
-        
-        # Store order in database
-        if db:
-            order_record = {
-                "razorpay_order_id": razorpay_order["id"],
-                "amount": request.amount,
-                "currency": request.currency,
-                "cart": [item.dict() for item in request.cart],
-                "status": "created",
-                "created_at": datetime.utcnow()
-            }
-            await db.orders.insert_one(order_record)
-        
-        return {
-            "id": razorpay_order["id"],
-            "amount": razorpay_order["amount"],
-            "currency": razorpay_order["currency"],
-            "status": razorpay_order["status"]
-        }
-        
-    except Exception as e:
-        print(f"Razorpay order creation error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to create order: {str(e)}")
-
-@api_router.post("/verify-payment")
-async def verify_payment(request: VerifyPaymentRequest):
-    """Verify Razorpay payment and process order"""
-    try:
-        # Verify payment signature
-        signature = request.razorpay_signature
-        order_id = request.razorpay_order_id
-        payment_id = request.razorpay_payment_id
-        
-        # Create signature for verification
-        message = f"{order_id}|{payment_id}"
-        generated_signature = hmac.new(
-            settings.RAZORPAY_KEY_SECRET.encode(),
-            message.encode(),
-            hashlib.sha256
-        ).hexdigest()
-        
-        if not hmac.compare_digest(signature, generated_signature):
-            raise HTTPException(status_code=400, detail="Invalid payment signature")
-        
-        # Get payment details from Razorpay
-        payment = razorpay_client.payment.fetch(payment_id)
-        
-        if payment["status"] != "captured":
-            raise HTTPException(status_code=400, detail="Payment not captured")
-        
-        # Update order status in database
-        if db:
-            await db.orders.update_one(
-                {"razorpay_order_id": order_id},
-                {
-                    "$set": {
-                        "razorpay_payment_id": payment_id,
-                        "status": "paid",
-                        "paid_at": datetime.utcnow(),
-                        "payment_details": payment
-                    }
-                }
-            )
-        
-        return {
-            "success": True,
-            "payment_id": payment_id,
-            "order_id": order_id,
-            "amount": payment["amount"],
-            "status": payment["status"],
-            "message": "Payment verified successfully"
-        }
-        
-    except Exception as e:
-        print(f"Payment verification error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Payment verification failed: {str(e)}")
-
-@api_router.get("/orders")
-async def get_orders():
-    """Get all orders"""
-    if not db:
-        return {"orders": []}
-    
-    try:
-        orders = await db.orders.find().sort("created_at", -1).to_list(100)
-        return {"orders": orders}
-    except Exception as e:
-        print(f"Error fetching orders: {str(e)}")
-        return {"orders": []}
-
-
-
-
+from product_cache import TTLCache
+from prefetch import Prefetcher
+from catalog_sync import CatalogSync, to_storefront_product
+from search_index import SearchIndex
+from product_table import ProductTable, TABLE_SORT_KEYS
+from facets import DEFAULT_PRICE_EDGES, MAX_PRICE_EDGES, facet_counts
+from suggest import MAX_SUGGESTIONS, SuggestIndex
+from search_popularity import SearchPopularity
+from db_indexes import apply_indexes, index_report, index_usage
+from http_cache import http_cache
+from fast_json import FastJSONResponse, FastJSONRoute, dumps as json_dumps
+from write_buffer import WriteBuffer
+from payment_events import PaymentEventProcessor, verify_webhook_signature
+from reconciliation import PaymentReconciler
+from idempotency import IdempotencyConflict, IdempotencyStore, request_fingerprint
+from price_index import PriceIndex, product_variants
+from single_flight import SingleFlight
+from shopify_throttle import CostScheduler, Priority, ShopifyThrottled
+from product_queries import (
+    ProductSelection, build_batch_query, build_products_query, project_product, resolve_selection
+)
+from razorpay_async import AsyncRazorpayClient, RAZORPAY_API_BASE_URL
+import base64
+import re
+from bson import ObjectId
+import asyncio
+import csv
+import math
+import io
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -164,10 +57,88 @@ class Settings(BaseSettings):
     SHOPIFY_API_VERSION: str = os.getenv("SHOPIFY_API_VERSION", "2024-01")
     RAZORPAY_KEY_ID: str = os.getenv("RAZORPAY_KEY_ID", "")
     RAZORPAY_KEY_SECRET: str = os.getenv("RAZORPAY_KEY_SECRET", "")
+    RAZORPAY_API_BASE_URL: str = os.getenv("RAZORPAY_API_BASE_URL", RAZORPAY_API_BASE_URL)
+    RAZORPAY_MAX_RETRIES: int = int(os.getenv("RAZORPAY_MAX_RETRIES", 3))
+    RAZORPAY_MAX_CONNECTIONS: int = int(os.getenv("RAZORPAY_MAX_CONNECTIONS", 50))
+    RAZORPAY_TIMEOUT: float = float(os.getenv("RAZORPAY_TIMEOUT", 10.0))
+    RAZORPAY_WEBHOOK_SECRET: str = os.getenv("RAZORPAY_WEBHOOK_SECRET", "")
+    WEBHOOK_WORKERS: int = int(os.getenv("WEBHOOK_WORKERS", 4))
+    WEBHOOK_QUEUE_SIZE: int = int(os.getenv("WEBHOOK_QUEUE_SIZE", 10000))
+    # Longer than the worst-case Razorpay order call; an older in_progress key is taken over
+    IDEMPOTENCY_LEASE_SECONDS: float = float(os.getenv("IDEMPOTENCY_LEASE_SECONDS", 120.0))
+
+    # Background reconciliation of orders stuck in "created"
+    RECONCILE_INTERVAL: float = float(os.getenv("RECONCILE_INTERVAL", 300))
+    RECONCILE_MIN_AGE_MINUTES: float = float(os.getenv("RECONCILE_MIN_AGE_MINUTES", 15))
+    RECONCILE_LOOKBACK_HOURS: float = float(os.getenv("RECONCILE_LOOKBACK_HOURS", 72))
+    RECONCILE_BATCH: int = int(os.getenv("RECONCILE_BATCH", 1000))
+    RECONCILE_MAX_RPS: float = float(os.getenv("RECONCILE_MAX_RPS", 2.0))
+    # How long after an order its payment is still looked for in the payments list
+    RECONCILE_PAYMENT_WINDOW_HOURS: float = float(os.getenv("RECONCILE_PAYMENT_WINDOW_HOURS", 24))
+    ADMIN_API_TOKEN: str = os.getenv("ADMIN_API_TOKEN", "")
+
+    # status_checks write coalescing
+    STATUS_WRITE_BATCH: int = int(os.getenv("STATUS_WRITE_BATCH", 500))
+    STATUS_WRITE_DELAY: float = float(os.getenv("STATUS_WRITE_DELAY", 0.25))
+    STATUS_WRITE_MAX_PENDING: int = int(os.getenv("STATUS_WRITE_MAX_PENDING", 10000))
     PORT: int = int(os.getenv("PORT", 8001))
+
+    # Shared Shopify HTTP client (connection pool + timeouts)
+    SHOPIFY_HTTP2: bool = os.getenv("SHOPIFY_HTTP2", "true").lower() == "true"
+    SHOPIFY_MAX_CONNECTIONS: int = int(os.getenv("SHOPIFY_MAX_CONNECTIONS", 100))
+    SHOPIFY_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("SHOPIFY_MAX_KEEPALIVE_CONNECTIONS", 20))
+    SHOPIFY_KEEPALIVE_EXPIRY: float = float(os.getenv("SHOPIFY_KEEPALIVE_EXPIRY", 30.0))
+    SHOPIFY_CONNECT_TIMEOUT: float = float(os.getenv("SHOPIFY_CONNECT_TIMEOUT", 5.0))
+    SHOPIFY_READ_TIMEOUT: float = float(os.getenv("SHOPIFY_READ_TIMEOUT", 30.0))
+    SHOPIFY_WRITE_TIMEOUT: float = float(os.getenv("SHOPIFY_WRITE_TIMEOUT", 10.0))
+    SHOPIFY_POOL_TIMEOUT: float = float(os.getenv("SHOPIFY_POOL_TIMEOUT", 5.0))
+    SHOPIFY_API_BASE_URL: str = os.getenv("SHOPIFY_API_BASE_URL", "")
+
+    # Shopify query-cost budget (resynced from extensions.cost on every response)
+    SHOPIFY_COST_CAPACITY: float = float(os.getenv("SHOPIFY_COST_CAPACITY", 1000.0))
+    SHOPIFY_COST_RESTORE_RATE: float = float(os.getenv("SHOPIFY_COST_RESTORE_RATE", 50.0))
+    SHOPIFY_DEFAULT_QUERY_COST: float = float(os.getenv("SHOPIFY_DEFAULT_QUERY_COST", 50.0))
+    SHOPIFY_BROWSE_MAX_WAIT: float = float(os.getenv("SHOPIFY_BROWSE_MAX_WAIT", 2.0))
+    SHOPIFY_BACKGROUND_MAX_WAIT: float = float(os.getenv("SHOPIFY_BACKGROUND_MAX_WAIT", 30.0))
+
+    # /api/products response cache
+    PRODUCTS_CACHE_MAX_ENTRIES: int = int(os.getenv("PRODUCTS_CACHE_MAX_ENTRIES", 2048))
+    PRODUCTS_CACHE_TTL: float = float(os.getenv("PRODUCTS_CACHE_TTL", 60.0))
+    PRODUCTS_CACHE_STALE_TTL: float = float(os.getenv("PRODUCTS_CACHE_STALE_TTL", 300.0))
+    # Browser/CDN caching of /api/products (Cache-Control + ETag)
+    PRODUCTS_HTTP_MAX_AGE: int = int(os.getenv("PRODUCTS_HTTP_MAX_AGE", 30))
+    PRODUCTS_HTTP_STALE_WHILE_REVALIDATE: int = int(os.getenv("PRODUCTS_HTTP_STALE_WHILE_REVALIDATE", 300))
+    CATALOG_HOME_HTTP_MAX_AGE: int = int(os.getenv("CATALOG_HOME_HTTP_MAX_AGE", 60))
+    CATALOG_HOME_HTTP_STALE_WHILE_REVALIDATE: int = int(os.getenv("CATALOG_HOME_HTTP_STALE_WHILE_REVALIDATE", 600))
+    PRODUCT_NODES_CACHE_MAX_ENTRIES: int = int(os.getenv("PRODUCT_NODES_CACHE_MAX_ENTRIES", 10000))
+    FACETS_HTTP_MAX_AGE: int = int(os.getenv("FACETS_HTTP_MAX_AGE", 60))
+    FACETS_HTTP_STALE_WHILE_REVALIDATE: int = int(os.getenv("FACETS_HTTP_STALE_WHILE_REVALIDATE", 600))
+    SUGGEST_HTTP_MAX_AGE: int = int(os.getenv("SUGGEST_HTTP_MAX_AGE", 300))
+    SUGGEST_HTTP_STALE_WHILE_REVALIDATE: int = int(os.getenv("SUGGEST_HTTP_STALE_WHILE_REVALIDATE", 3600))
+    # Seconds to coalesce catalog changes before rebuilding the autocomplete index
+    SUGGEST_REBUILD_DELAY: float = float(os.getenv("SUGGEST_REBUILD_DELAY", 5.0))
+    SUGGEST_MAX_TRACKED_QUERIES: int = int(os.getenv("SUGGEST_MAX_TRACKED_QUERIES", 10000))
+    # Seconds between search-count flushes; the index is rebuilt when the shared counts moved
+    SUGGEST_POPULARITY_INTERVAL: float = float(os.getenv("SUGGEST_POPULARITY_INTERVAL", 300.0))
+    PRODUCTS_PREFETCH: bool = os.getenv("PRODUCTS_PREFETCH", "false").lower() == "true"
+    PRODUCTS_PREFETCH_CONCURRENCY: int = int(os.getenv("PRODUCTS_PREFETCH_CONCURRENCY", 4))
+    # Fraction of the Shopify cost bucket that must be available for prefetching
+    PRODUCTS_PREFETCH_MIN_BUDGET: float = float(os.getenv("PRODUCTS_PREFETCH_MIN_BUDGET", 0.5))
+
+    # Server-side cart total validation
+    CART_VALIDATION: bool = os.getenv("CART_VALIDATION", "true").lower() == "true"
+    PRICE_INDEX_MAX_AGE: float = float(os.getenv("PRICE_INDEX_MAX_AGE", 900.0))
+
+    # Local catalog mirror ("shopify" serves /api/products live, "mirror" from MongoDB)
+    CATALOG_SOURCE: str = os.getenv("CATALOG_SOURCE", "shopify")
+    CATALOG_SYNC_INTERVAL: float = float(os.getenv("CATALOG_SYNC_INTERVAL", 0))
+    CATALOG_SYNC_PAGE_SIZE: int = int(os.getenv("CATALOG_SYNC_PAGE_SIZE", 250))
+    # How often mirror-served workers re-read catalog_sync_state for their ETag version
+    CATALOG_VERSION_POLL_INTERVAL: float = float(os.getenv("CATALOG_VERSION_POLL_INTERVAL", 10.0))
     
     class Config:
         env_file = ".env"
+        extra = "ignore"
 
 settings = Settings()
 
@@ -180,14 +151,528 @@ except Exception as e:
     client = None
     db = None
 
-# Initialize Razorpay client
-razorpay_client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
+# Batched status_checks inserts, flushed on shutdown
+status_write_buffer = WriteBuffer(
+    db.status_checks,
+    max_batch=settings.STATUS_WRITE_BATCH,
+    max_delay=settings.STATUS_WRITE_DELAY,
+    max_pending=settings.STATUS_WRITE_MAX_PENDING
+) if db is not None else None
+
+# Idempotency-Key records for order creation
+idempotency_store = IdempotencyStore(
+    db.idempotency_keys,
+    lease=settings.IDEMPOTENCY_LEASE_SECONDS
+) if db is not None else None
+
+# Razorpay webhook events, applied to orders by background workers
+payment_events = PaymentEventProcessor(
+    db,
+    workers=settings.WEBHOOK_WORKERS,
+    max_queue=settings.WEBHOOK_QUEUE_SIZE
+) if db is not None else None
+
+# Async Razorpay client, opened on startup and closed on shutdown
+razorpay_client: Optional[AsyncRazorpayClient] = None
+
+# Periodic payment reconciliation through batched Razorpay list calls
+payment_reconciler = PaymentReconciler(
+    db,
+    lambda: razorpay_client,
+    min_age=timedelta(minutes=settings.RECONCILE_MIN_AGE_MINUTES),
+    lookback=timedelta(hours=settings.RECONCILE_LOOKBACK_HOURS),
+    batch_size=settings.RECONCILE_BATCH,
+    max_requests_per_second=settings.RECONCILE_MAX_RPS,
+    payment_window=timedelta(hours=settings.RECONCILE_PAYMENT_WINDOW_HOURS)
+) if db is not None else None
+payment_reconciler_task: Optional[asyncio.Task] = None
+
+def build_razorpay_client() -> AsyncRazorpayClient:
+    return AsyncRazorpayClient(
+        settings.RAZORPAY_KEY_ID,
+        settings.RAZORPAY_KEY_SECRET,
+        base_url=settings.RAZORPAY_API_BASE_URL,
+        max_retries=settings.RAZORPAY_MAX_RETRIES,
+        timeout=httpx.Timeout(settings.RAZORPAY_TIMEOUT, connect=5.0),
+        limits=httpx.Limits(
+            max_connections=settings.RAZORPAY_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.RAZORPAY_MAX_CONNECTIONS // 5 or 1
+        )
+    )
+
+# Shared Shopify HTTP client, opened on startup and closed on shutdown
+shopify_http_client: Optional[httpx.AsyncClient] = None
+
+def build_shopify_http_client() -> httpx.AsyncClient:
+    """Create the pooled keep-alive client used for every Storefront call"""
+    return httpx.AsyncClient(
+        base_url=settings.SHOPIFY_API_BASE_URL or f"https://{settings.SHOPIFY_STORE_DOMAIN}/api/{settings.SHOPIFY_API_VERSION}",
+        headers={
+            "Content-Type": "application/json",
+            "X-Shopify-Storefront-Access-Token": settings.SHOPIFY_STOREFRONT_ACCESS_TOKEN
+        },
+        http2=settings.SHOPIFY_HTTP2,
+        limits=httpx.Limits(
+            max_connections=settings.SHOPIFY_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.SHOPIFY_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.SHOPIFY_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(
+            connect=settings.SHOPIFY_CONNECT_TIMEOUT,
+            read=settings.SHOPIFY_READ_TIMEOUT,
+            write=settings.SHOPIFY_WRITE_TIMEOUT,
+            pool=settings.SHOPIFY_POOL_TIMEOUT
+        )
+    )
+
+# Client-side model of the Shopify query-cost bucket
+shopify_scheduler = CostScheduler(
+    capacity=settings.SHOPIFY_COST_CAPACITY,
+    restore_rate=settings.SHOPIFY_COST_RESTORE_RATE,
+    default_cost=settings.SHOPIFY_DEFAULT_QUERY_COST,
+    max_waits={
+        Priority.CRITICAL: math.inf,
+        Priority.BROWSE: settings.SHOPIFY_BROWSE_MAX_WAIT,
+        Priority.BACKGROUND: settings.SHOPIFY_BACKGROUND_MAX_WAIT
+    }
+)
+
+def is_throttled(result: Dict[str, Any]) -> bool:
+    return any((error.get("extensions") or {}).get("code") == "THROTTLED" for error in result.get("errors") or [])
+
+# Identical concurrent Storefront queries share one upstream call
+shopify_flights = SingleFlight()
+
+async def shopify_graphql(
+    query: str,
+    variables: Dict[str, Any],
+    priority: Priority = Priority.BROWSE,
+    max_wait: Optional[float] = None
+) -> Dict[str, Any]:
+    """Run a Storefront GraphQL query and return its `data` payload
+
+    Joiners share the first caller's call, including its shedding policy. If
+    that call was shed or throttled, a joiner retries under its own priority
+    and max_wait, so checkout never fails because it joined a prefetch.
+    """
+    key = request_fingerprint([query, variables])
+    led = False
+
+    def send():
+        nonlocal led
+        led = True
+        return send_shopify_graphql(query, variables, priority, max_wait)
+
+    try:
+        return await shopify_flights.run(key, send)
+    except ShopifyThrottled:
+        if led:
+            raise
+    return await shopify_flights.run(
+        (key, priority, max_wait),
+        lambda: send_shopify_graphql(query, variables, priority, max_wait)
+    )
+
+async def send_shopify_graphql(
+    query: str,
+    variables: Dict[str, Any],
+    priority: Priority,
+    max_wait: Optional[float]
+) -> Dict[str, Any]:
+    # Opened and closed only by the startup/shutdown hooks; late background
+    # work (refreshes, prefetches) must not reopen a client nobody will close
+    if shopify_http_client is None:
+        raise HTTPException(status_code=503, detail="Shopify client is not open")
+
+    # Checkout calls retry once after an upstream THROTTLED, everything else is shed
+    attempts = 2 if priority == Priority.CRITICAL else 1
+    for attempt in range(attempts):
+        cost = shopify_scheduler.estimate(query)
+        await shopify_scheduler.acquire(cost, priority, max_wait)
+
+        response = await shopify_http_client.post(
+            "/graphql.json",
+            json={"query": query, "variables": variables}
+        )
+
+        if response.status_code == 429:
+            retry_after = shopify_scheduler.record_throttled(None)
+            if attempt + 1 < attempts:
+                continue
+            raise ShopifyThrottled("Shopify rate limit exceeded", retry_after=retry_after)
+
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"Shopify API error: {response.text}"
+            )
+
+        result = response.json()
+
+        if is_throttled(result):
+            retry_after = shopify_scheduler.record_throttled(result.get("extensions"))
+            if attempt + 1 < attempts:
+                continue
+            raise ShopifyThrottled("Shopify query cost budget exhausted", retry_after=retry_after)
+
+        shopify_scheduler.settle(query, cost, result.get("extensions"))
+
+        if "errors" in result:
+            raise HTTPException(status_code=400, detail=result["errors"])
+
+        return result["data"]
+
+def throttled_response(e: ShopifyThrottled) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))})
+
+# Catalog mirror kept in MongoDB by paginated Shopify syncs
+catalog_sync = CatalogSync(
+    db,
+    lambda query, variables: shopify_graphql(query, variables, Priority.BACKGROUND),
+    page_size=settings.CATALOG_SYNC_PAGE_SIZE
+) if db is not None else None
+catalog_sync_task: Optional[asyncio.Task] = None
+
+def serve_from_mirror() -> bool:
+    return settings.CATALOG_SOURCE == "mirror" and catalog_sync is not None
+
+# Ranked full-text search over the catalog mirror
+search_index = SearchIndex()
+
+# Columnar price/date/availability/collection table for listing filters and sorts
+product_table = ProductTable()
+
+INDEX_SORT_KEYS = {
+    "CREATED_AT": lambda doc: doc.get("createdAt") or "",
+    "UPDATED_AT": lambda doc: doc.get("updatedAt") or "",
+    "TITLE": lambda doc: (doc.get("title") or "").lower(),
+    "PRICE": lambda doc: doc.get("min_price") or 0.0,
+}
+
+def encode_offset_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(f"offset:{offset}".encode()).decode()
+
+def decode_offset_cursor(cursor: str) -> int:
+    try:
+        prefix, offset = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        if prefix != "offset":
+            raise ValueError
+        return int(offset)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def search_from_index(
+    first: int,
+    after: Optional[str],
+    collection_handle: Optional[str],
+    search_query: str,
+    sort_key: str,
+    reverse: bool,
+    min_price: Optional[float],
+    max_price: Optional[float],
+    available: Optional[bool] = None
+) -> Dict[str, Any]:
+    """Serve a /api/products search page from the in-memory index"""
+    start = decode_offset_cursor(after) if after else 0
+    # Plain relevance pages only need the top slice, everything else ranks all matches
+    filtered = collection_handle or min_price is not None or max_price is not None or available is not None
+    plain = not (filtered or reverse) and sort_key not in INDEX_SORT_KEYS
+    limit = start + first + 1 if plain else None
+    docs = [search_index.documents[doc_id] for doc_id, _ in search_index.search(search_query, limit=limit)]
+
+    if collection_handle:
+        docs = [doc for doc in docs if collection_handle in doc.get("collections", [])]
+    if min_price is not None:
+        docs = [doc for doc in docs if (doc.get("max_price") or 0.0) >= min_price]
+    if max_price is not None:
+        docs = [doc for doc in docs if doc.get("min_price") is not None and doc["min_price"] <= max_price]
+    if available is not None:
+        docs = [doc for doc in docs if bool(doc.get("available")) == available]
+
+    # Relevance order unless the caller asked for a specific sort
+    if sort_key in INDEX_SORT_KEYS:
+        docs.sort(key=INDEX_SORT_KEYS[sort_key], reverse=reverse)
+    elif reverse:
+        docs.reverse()
+
+    page = docs[start:start + first]
+    return {
+        "products": [to_storefront_product(doc) for doc in page],
+        "pageInfo": {
+            "hasNextPage": start + first < len(docs),
+            "hasPreviousPage": start > 0,
+            "startCursor": encode_offset_cursor(start) if page else None,
+            "endCursor": encode_offset_cursor(start + len(page)) if page else None
+        },
+        "totalCount": len(page)
+    }
+
+# Version markers read from catalog_sync_state, so every worker holding the
+# same catalog validates the same ETags. `catalog_version` is what this
+# worker's in-memory indexes reflect; `mirror_version` follows MongoDB itself.
+# None while unknown or mid-sync, which falls back to body-hash ETags.
+catalog_version: Optional[str] = None
+mirror_version: Optional[str] = None
+catalog_version_task: Optional[asyncio.Task] = None
+
+def clear_catalog_version(docs=None) -> None:
+    global catalog_version, mirror_version
+    catalog_version = mirror_version = None
+
+async def refresh_catalog_version() -> None:
+    global catalog_version, mirror_version
+    catalog_version = mirror_version = await catalog_sync.version()
+
+async def poll_mirror_version():
+    """Pick up syncs run by other workers for pages served straight from MongoDB"""
+    global mirror_version
+    while True:
+        await asyncio.sleep(settings.CATALOG_VERSION_POLL_INTERVAL)
+        try:
+            if not catalog_sync.running:
+                mirror_version = await catalog_sync.version()
+        except Exception as e:
+            logger.error(f"Catalog version poll failed: {e}")
+
+def serve_from_table(search_query: Optional[str], sort_key: str, after: Optional[str]) -> bool:
+    # The table mirrors the synced catalog, so it only stands in for Shopify
+    # when the deployment opted into mirror serving
+    if not serve_from_mirror() or search_query or not product_table.ready or sort_key not in TABLE_SORT_KEYS:
+        return False
+    try:
+        # Cursors handed out by Shopify or the mirror keep being served the usual way
+        return not after or decode_offset_cursor(after) >= 0
+    except ValueError:
+        return False
+
+def serve_from_index(search_query: Optional[str], after: Optional[str]) -> bool:
+    # Like the table, the search index is fed by catalog sync: mirror mode only
+    if not serve_from_mirror() or not search_query or not search_index.ready:
+        return False
+    try:
+        return not after or decode_offset_cursor(after) >= 0
+    except ValueError:
+        return False
+
+def products_version(request: Request) -> Optional[str]:
+    """Catalog version when /api/products is served from the mirror or in-memory indexes"""
+    params = request.query_params
+    if serve_from_index(params.get("search_query"), params.get("after")) \
+            or serve_from_table(params.get("search_query"), params.get("sort_key", "CREATED_AT"), params.get("after")):
+        return catalog_version
+    if serve_from_mirror():
+        return mirror_version
+    return None
+
+def table_page(
+    first: int,
+    after: Optional[str],
+    collection_handle: Optional[str],
+    sort_key: str,
+    reverse: bool,
+    min_price: Optional[float],
+    max_price: Optional[float],
+    available: Optional[bool]
+) -> Dict[str, Any]:
+    """Serve a filtered/sorted /api/products page from the product table"""
+    start = decode_offset_cursor(after) if after else 0
+    ids, total = product_table.query(
+        sort_key, reverse, start, first,
+        collection_handle=collection_handle, min_price=min_price, max_price=max_price, available=available
+    )
+    return {
+        "products": [to_storefront_product(product_table.documents[product_id]) for product_id in ids],
+        "pageInfo": {
+            "hasNextPage": start + len(ids) < total,
+            "hasPreviousPage": start > 0,
+            "startCursor": encode_offset_cursor(start) if ids else None,
+            "endCursor": encode_offset_cursor(start + len(ids)) if ids else None
+        },
+        "totalCount": len(ids)
+    }
+
+def table_version(request: Request) -> Optional[str]:
+    return catalog_version if product_table.ready else None
+
+# Autocomplete over titles, tags, vendors and collections; rebuilt off the event
+# loop and swapped in whole, so lookups always see a complete index
+suggest_index = SuggestIndex([], [])
+suggest_generation = 0
+suggest_index_version: Optional[str] = None
+suggest_rebuild_task: Optional[asyncio.Task] = None
+suggest_popularity_task: Optional[asyncio.Task] = None
+search_popularity = SearchPopularity(
+    db.search_popularity if db is not None else None,
+    max_terms=settings.SUGGEST_MAX_TRACKED_QUERIES
+)
+
+async def rebuild_suggest_index() -> None:
+    global suggest_index, suggest_generation, suggest_index_version
+    version = catalog_version
+    docs = list(product_table.documents.values())
+    popularity = dict(search_popularity.counts)
+    suggest_index = await asyncio.to_thread(SuggestIndex.build, docs, popularity)
+    suggest_generation += 1
+    # Same catalog and popularity snapshot in every worker -> same ETag
+    suggest_index_version = (
+        f"{version}:{request_fingerprint(sorted(popularity.items()))}"
+        if version is not None and version == catalog_version else None
+    )
+
+def schedule_suggest_rebuild(docs=None) -> None:
+    """Coalesce catalog changes into one rebuild after SUGGEST_REBUILD_DELAY"""
+    global suggest_rebuild_task
+    if suggest_rebuild_task is not None and not suggest_rebuild_task.done():
+        return
+
+    async def rebuild_later():
+        await asyncio.sleep(settings.SUGGEST_REBUILD_DELAY)
+        try:
+            await rebuild_suggest_index()
+        except Exception as e:
+            logger.error(f"Suggest index rebuild failed: {e}")
+
+    suggest_rebuild_task = asyncio.create_task(rebuild_later())
+
+async def refresh_suggest_popularity():
+    """Flush search counts and rebuild suggestions when the shared counts moved"""
+    while True:
+        await asyncio.sleep(settings.SUGGEST_POPULARITY_INTERVAL)
+        try:
+            if await search_popularity.refresh() and len(product_table):
+                await rebuild_suggest_index()
+        except Exception as e:
+            logger.error(f"Search popularity refresh failed: {e}")
+
+def suggest_version(request: Request) -> Optional[str]:
+    return suggest_index_version if len(suggest_index) else None
+
+def shopify_search_term(value: str) -> str:
+    """Strip characters that break Storefront search syntax"""
+    return re.sub(r'["\\():*]', " ", value).strip()
+
+# Variant price index for checkout validation
+price_index = PriceIndex(max_age=settings.PRICE_INDEX_MAX_AGE)
+
+PRICE_NODES_QUERY = """
+query priceNodes($ids: [ID!]!) {
+    nodes(ids: $ids) {
+        ... on Product {
+            id
+            variants(first: 10) {
+                edges {
+                    node {
+                        id
+                        price {
+                            amount
+                            currencyCode
+                        }
+                        availableForSale
+                    }
+                }
+            }
+        }
+        ... on ProductVariant {
+            id
+            price {
+                amount
+                currencyCode
+            }
+            availableForSale
+            product {
+                id
+            }
+        }
+    }
+}
+"""
+
+async def refresh_prices(item_ids: List[str]) -> None:
+    """Fetch products/variants missing from the price index in one round trip"""
+    data = await shopify_graphql(PRICE_NODES_QUERY, {"ids": item_ids}, Priority.CRITICAL)
+    for node in data["nodes"]:
+        if not node:
+            continue
+        if "variants" in node:
+            price_index.update_products([node])
+        else:
+            price_index.update_variant(node, node["product"]["id"])
+
+def index_prices(products: List[Dict[str, Any]], selection: ProductSelection) -> None:
+    # Without variants in the response there is nothing to index, and nothing to drop
+    if "variants" not in selection.fields:
+        return
+    if selection.variants >= 10:
+        price_index.update_products(products)
+    else:
+        # A truncated variant list must not drop the product's other variants
+        for product in products:
+            for variant in product_variants(product):
+                price_index.update_variant(variant, product["id"])
+
+# In-process /api/products response cache
+products_cache = TTLCache(
+    max_entries=settings.PRODUCTS_CACHE_MAX_ENTRIES,
+    ttl=settings.PRODUCTS_CACHE_TTL,
+    stale_ttl=settings.PRODUCTS_CACHE_STALE_TTL
+)
+
+# Background next-page loads, skipped while the Shopify budget is low
+products_prefetcher = Prefetcher(
+    products_cache,
+    max_concurrency=settings.PRODUCTS_PREFETCH_CONCURRENCY,
+    should_skip=lambda: shopify_scheduler.low_budget(settings.PRODUCTS_PREFETCH_MIN_BUDGET)
+)
+
+# Single products by (selection, id or handle) for /api/products/batch
+product_nodes_cache = TTLCache(
+    max_entries=settings.PRODUCT_NODES_CACHE_MAX_ENTRIES,
+    ttl=settings.PRODUCTS_CACHE_TTL,
+    stale_ttl=0
+)
+product_batch_stats = {"requests": 0, "local_hits": 0, "upstream_lookups": 0, "not_found": 0}
+
+def local_product(key: str, selection: ProductSelection) -> Optional[Dict[str, Any]]:
+    """A product by id, variant id or handle from the node cache or, in mirror mode, the catalog mirror"""
+    product = product_nodes_cache.peek((selection, key))
+    if product is not None or not serve_from_mirror():
+        return product
+    variant = price_index.variants.get(key)
+    doc_id = variant.product_id if variant else search_index.handle_ids.get(key, key)
+    doc = search_index.documents.get(doc_id)
+    return project_product(to_storefront_product(doc), selection) if doc is not None else None
+
+def products_cache_key(
+    first: int,
+    after: Optional[str],
+    collection_handle: Optional[str],
+    search_query: Optional[str],
+    sort_key: str,
+    reverse: bool,
+    min_price: Optional[float],
+    max_price: Optional[float],
+    available: Optional[bool] = None,
+    selection: Optional[ProductSelection] = None
+) -> tuple:
+    """Normalize get_products arguments so equivalent requests share a cache key"""
+    return (
+        selection,
+        first,
+        after or None,
+        collection_handle.strip().lower() if collection_handle else None,
+        " ".join(search_query.lower().split()) if search_query else None,
+        sort_key,
+        bool(reverse),
+        float(min_price) if min_price is not None else None,
+        float(max_price) if max_price is not None else None,
+        available
+    )
 
 # Create the main app
-app = FastAPI(title="Undhyu.com API", version="1.0.0")
+app = FastAPI(title="Undhyu.com API", version="1.0.0", default_response_class=FastJSONResponse)
 
 # Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
+api_router = APIRouter(prefix="/api", route_class=FastJSONRoute)
 
 # Pydantic Models
 class StatusCheck(BaseModel):
@@ -199,7 +684,7 @@ class StatusCheckCreate(BaseModel):
     client_name: str
 
 class CartItem(BaseModel):
-    id: str
+    id: str  # Product id (first variant is priced) or variant id
     title: str
     quantity: int
     price: float
@@ -216,56 +701,181 @@ class VerifyPaymentRequest(BaseModel):
     razorpay_signature: str
     cart: List[CartItem]
 
+# Admin guard
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Guard admin endpoints with ADMIN_API_TOKEN when one is configured"""
+    if settings.ADMIN_API_TOKEN and not hmac.compare_digest(x_admin_token or "", settings.ADMIN_API_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
 # Original status endpoints
 @api_router.post("/status", response_model=StatusCheck)
 async def create_status_check(input: StatusCheckCreate):
     status_dict = input.dict()
     status_obj = StatusCheck(**status_dict)
-    if db:
-        _ = await db.status_checks.insert_one(status_obj.dict())
+    if status_write_buffer is not None:
+        await status_write_buffer.add(status_obj.dict())
     return status_obj
 
-@api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    if not db:
+# Only the declared StatusCheck fields are read back
+STATUS_CHECK_PROJECTION = {"_id": 0, "id": 1, "client_name": 1, "timestamp": 1}
+
+def encode_status_cursor(status_check: Dict[str, Any]) -> str:
+    raw = f"{status_check['timestamp'].isoformat()}|{status_check['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def build_status_filter(
+    since: Optional[datetime],
+    until: Optional[datetime],
+    after: Optional[str]
+) -> Dict[str, Any]:
+    """Mongo filter for status checks, newest first by (timestamp, id)"""
+    conditions: List[Dict[str, Any]] = []
+    if since or until:
+        window: Dict[str, Any] = {}
+        if since:
+            window["$gte"] = since
+        if until:
+            window["$lt"] = until
+        conditions.append({"timestamp": window})
+    if after:
+        try:
+            timestamp, status_id = base64.urlsafe_b64decode(after.encode()).decode().split("|")
+            timestamp = datetime.fromisoformat(timestamp)
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        conditions.append({"$or": [
+            {"timestamp": {"$lt": timestamp}},
+            {"timestamp": timestamp, "id": {"$lt": status_id}}
+        ]})
+    return {"$and": conditions} if conditions else {}
+
+# Documents are written by create_status_check, so they are returned as-is
+# instead of being re-validated through StatusCheck one by one
+@api_router.get("/status", responses={200: {"model": List[StatusCheck]}})
+async def get_status_checks(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    after: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page")
+):
+    if db is None:
         return []
-    status_checks = await db.status_checks.find().to_list(1000)
-    return [StatusCheck(**status_check) for status_check in status_checks]
+    status_checks = await db.status_checks.find(
+        build_status_filter(since, until, after),
+        STATUS_CHECK_PROJECTION
+    ).sort([("timestamp", -1), ("id", -1)]).limit(limit + 1).to_list(limit + 1)
+
+    if len(status_checks) > limit:
+        status_checks = status_checks[:limit]
+        response.headers["X-Next-Cursor"] = encode_status_cursor(status_checks[-1])
+    return status_checks
+
+async def iter_status_checks(mongo_filter: Dict[str, Any], batch_size: int = 1000):
+    cursor = db.status_checks.find(mongo_filter, STATUS_CHECK_PROJECTION, batch_size=batch_size) \
+        .sort([("timestamp", -1), ("id", -1)])
+    lines = []
+    async for status_check in cursor:
+        lines.append(json_dumps(status_check))
+        if len(lines) >= batch_size:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+@api_router.get("/status/stream")
+async def stream_status_checks(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """Stream every status check in the window as NDJSON"""
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database not available")
+    return StreamingResponse(
+        iter_status_checks(build_status_filter(since, until, None)),
+        media_type="application/x-ndjson"
+    )
 
 # Razorpay Payment Endpoints
-@api_router.post("/create-razorpay-order")
-async def create_razorpay_order(request: CreateOrderRequest):
-    """Create Razorpay order for payment"""
-    try:
-        # Create order in Razorpay
-        order_data = {
+async def create_order_for_cart(request: CreateOrderRequest) -> Dict[str, Any]:
+    """Validate the cart, then create the Razorpay order and record it"""
+    # Part of the idempotent call: a stored response is replayed without revalidating
+    if settings.CART_VALIDATION:
+        await validate_cart_total(request)
+
+    # Create order in Razorpay
+    order_data = {
+        "amount": request.amount,
+        "currency": request.currency,
+        "receipt": f"order_{uuid.uuid4()}",
+        "payment_capture": 1
+    }
+    
+    razorpay_order = await razorpay_client.create_order(order_data)
+    
+    # Store order in database
+    if db is not None:
+        order_record = {
+            "razorpay_order_id": razorpay_order["id"],
             "amount": request.amount,
             "currency": request.currency,
-            "receipt": f"order_{uuid.uuid4()}",
-            "payment_capture": 1
-        }
-        
-        razorpay_order = razorpay_client.order.create(data=order_data)
-        
-        # Store order in database
-        if db:
-            order_record = {
-                "razorpay_order_id": razorpay_order["id"],
-                "amount": request.amount,
-                "currency": request.currency,
-                "cart": [item.dict() for item in request.cart],
-                "status": "created",
-                "created_at": datetime.utcnow()
-            }
-            await db.orders.insert_one(order_record)
-        
-        return {
-            "id": razorpay_order["id"],
-            "amount": razorpay_order["amount"],
-            "currency": razorpay_order["currency"],
-            "status": razorpay_order["status"]
+            "cart": [item.dict() for item in request.cart],
+            "status": "created",
+            "created_at": datetime.utcnow()
         }
+        await db.orders.insert_one(order_record)
+    
+    return {
+        "id": razorpay_order["id"],
+        "amount": razorpay_order["amount"],
+        "currency": razorpay_order["currency"],
+        "status": razorpay_order["status"]
+    }
+
+async def validate_cart_total(request: CreateOrderRequest) -> None:
+    """Recompute the cart total from the price index and reject mismatches"""
+    item_ids = [item.id for item in request.cart]
+    missing = price_index.missing(item_ids)
+    if missing:
+        await refresh_prices(missing)
+
+    expected, problems = price_index.quote(
+        ((item.id, item.quantity, item.price) for item in request.cart),
+        request.currency
+    )
+    if not request.cart:
+        problems.append(("cart", "empty cart"))
+    # The storefront rounds the float sum; allow for a single paisa of drift
+    if not problems and abs(expected - request.amount) > 1:
+        problems.append(("amount", f"expected {expected} paise"))
+    if problems:
+        raise HTTPException(status_code=400, detail={
+            "message": "Cart does not match current prices",
+            "expected_amount": expected,
+            "problems": [{"id": item_id, "reason": reason} for item_id, reason in problems]
+        })
+
+@api_router.post("/create-razorpay-order")
+async def create_razorpay_order(
+    request: CreateOrderRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
+):
+    """Create Razorpay order for payment; retries with the same Idempotency-Key get the original response"""
+    try:
+        if idempotency_key and idempotency_store is not None:
+            return await idempotency_store.run(
+                f"create-razorpay-order:{idempotency_key}",
+                request_fingerprint(request.model_dump()),
+                lambda: create_order_for_cart(request)
+            )
+        return await create_order_for_cart(request)
         
+    except HTTPException:
+        raise
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ShopifyThrottled as e:
+        raise throttled_response(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create order: {str(e)}")
 
@@ -290,13 +900,13 @@ async def verify_payment(request: VerifyPaymentRequest):
             raise HTTPException(status_code=400, detail="Invalid payment signature")
         
         # Get payment details from Razorpay
-        payment = razorpay_client.payment.fetch(payment_id)
+        payment = await razorpay_client.fetch_payment(payment_id)
         
         if payment["status"] != "captured":
             raise HTTPException(status_code=400, detail="Payment not captured")
         
         # Update order status in database
-        if db:
+        if db is not None:
             await db.orders.update_one(
                 {"razorpay_order_id": order_id},
                 {
@@ -323,17 +933,186 @@ async def verify_payment(request: VerifyPaymentRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Payment verification failed: {str(e)}")
 
+@api_router.post("/razorpay/webhook")
+async def razorpay_webhook(request: Request):
+    """Verify a Razorpay webhook and queue it; processing happens in the background"""
+    body = await request.body()
+    if not verify_webhook_signature(body, request.headers.get("X-Razorpay-Signature"), settings.RAZORPAY_WEBHOOK_SECRET):
+        raise HTTPException(status_code=400, detail="Invalid webhook signature")
+    if payment_events is None:
+        raise HTTPException(status_code=503, detail="Database not available")
+
+    try:
+        event = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid webhook payload")
+
+    event_id = request.headers.get("X-Razorpay-Event-Id") or hashlib.sha256(body).hexdigest()
+    try:
+        queued = payment_events.submit(event_id, event)
+    except asyncio.QueueFull:
+        # Razorpay retries non-2xx deliveries
+        raise HTTPException(status_code=503, detail="Webhook queue full")
+    return {"status": "ok", "duplicate": not queued}
+
+# Heavy order sub-documents left out of listings unless asked for
+ORDER_HEAVY_FIELDS = ("payment_details",)
+
+def encode_order_cursor(order: Dict[str, Any]) -> str:
+    raw = f"{order['created_at'].isoformat()}|{order['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_order_cursor(cursor: str) -> tuple:
+    try:
+        created_at, order_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), ObjectId(order_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def build_orders_filter(
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    after: Optional[str] = None
+) -> Dict[str, Any]:
+    """Mongo filter for order listings, newest first by (created_at, _id)"""
+    conditions: List[Dict[str, Any]] = []
+    if status:
+        conditions.append({"status": status})
+    if created_from or created_to:
+        created_range: Dict[str, Any] = {}
+        if created_from:
+            created_range["$gte"] = created_from
+        if created_to:
+            created_range["$lt"] = created_to
+        conditions.append({"created_at": created_range})
+    if after:
+        created_at, order_id = decode_order_cursor(after)
+        conditions.append({"$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": order_id}}
+        ]})
+    return {"$and": conditions} if conditions else {}
+
+def orders_projection(include: Optional[str]) -> Optional[Dict[str, int]]:
+    requested = {field.strip() for field in include.split(",")} if include else set()
+    excluded = {field: 0 for field in ORDER_HEAVY_FIELDS if field not in requested}
+    return excluded or None
+
 @api_router.get("/orders")
-async def get_orders():
-    """Get all orders"""
-    if not db:
-        return {"orders": []}
+async def get_orders(
+    limit: int = Query(50, ge=1, le=500),
+    after: Optional[str] = None,
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    include: Optional[str] = Query(None, description="Comma-separated heavy fields to include, e.g. payment_details")
+):
+    """List orders newest first with keyset pagination"""
+    if db is None:
+        return {"orders": [], "pageInfo": {"hasNextPage": False, "endCursor": None}}
     
-    orders = await db.orders.find().sort("created_at", -1).to_list(100)
-    return {"orders": orders}
+    orders = await db.orders.find(
+        build_orders_filter(status, created_from, created_to, after),
+        orders_projection(include)
+    ).sort([("created_at", -1), ("_id", -1)]).limit(limit + 1).to_list(limit + 1)
+
+    has_next = len(orders) > limit
+    orders = orders[:limit]
+    end_cursor = encode_order_cursor(orders[-1]) if orders else None
+    return {"orders": orders, "pageInfo": {"hasNextPage": has_next, "endCursor": end_cursor}}
+
+ORDER_EXPORT_COLUMNS = [
+    "_id", "razorpay_order_id", "razorpay_payment_id", "status", "amount",
+    "currency", "created_at", "paid_at", "item_count", "cart", "cursor"
+]
+
+def flush_export_chunk(buffer: io.StringIO, lines: List[bytes]) -> bytes:
+    """Drain the pending CSV rows or NDJSON lines into one chunk"""
+    if lines:
+        chunk = b"\n".join(lines) + b"\n"
+        lines.clear()
+        return chunk
+    chunk = buffer.getvalue().encode()
+    buffer.seek(0)
+    buffer.truncate()
+    return chunk
+
+async def iter_orders_export(
+    export_format: str,
+    mongo_filter: Dict[str, Any],
+    projection: Optional[Dict[str, int]],
+    batch_size: int
+):
+    """Yield export chunks one cursor batch at a time so memory stays flat"""
+    cursor = db.orders.find(mongo_filter, projection, batch_size=batch_size) \
+        .sort([("created_at", -1), ("_id", -1)])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if export_format == "csv":
+        writer.writerow(ORDER_EXPORT_COLUMNS)
+
+    lines: List[bytes] = []
+    pending = 0
+    async for order in cursor:
+        resume_cursor = encode_order_cursor(order)
+        if export_format == "csv":
+            cart = order.get("cart") or []
+            writer.writerow([
+                str(order["_id"]),
+                order.get("razorpay_order_id", ""),
+                order.get("razorpay_payment_id", ""),
+                order.get("status", ""),
+                order.get("amount", ""),
+                order.get("currency", ""),
+                order["created_at"].isoformat(),
+                order["paid_at"].isoformat() if order.get("paid_at") else "",
+                len(cart),
+                json_dumps(cart).decode(),
+                resume_cursor
+            ])
+        else:
+            order["_cursor"] = resume_cursor
+            lines.append(json_dumps(order))
+
+        pending += 1
+        if pending >= batch_size:
+            yield flush_export_chunk(buffer, lines)
+            pending = 0
+
+    if pending or buffer.tell():
+        yield flush_export_chunk(buffer, lines)
+
+@api_router.get("/orders/export", dependencies=[Depends(require_admin)])
+async def export_orders(
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    after: Optional[str] = Query(None, description="Resume after the `cursor` of the last exported row"),
+    include: Optional[str] = None,
+    batch_size: int = Query(500, ge=1, le=5000)
+):
+    """Stream every matching order as NDJSON or CSV, newest first"""
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database not available")
+
+    mongo_filter = build_orders_filter(status, created_from, created_to, after)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"orders-{datetime.utcnow():%Y%m%d%H%M%S}.{format}"
+    return StreamingResponse(
+        iter_orders_export(format, mongo_filter, orders_projection(include), batch_size),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 # Shopify Products Endpoints (existing code...)
 @api_router.get("/products")
+@http_cache(
+    max_age=settings.PRODUCTS_HTTP_MAX_AGE,
+    stale_while_revalidate=settings.PRODUCTS_HTTP_STALE_WHILE_REVALIDATE,
+    version=products_version
+)
 async def get_products(
     first: int = Query(20, le=250),
     after: Optional[str] = None,
@@ -342,127 +1121,324 @@ async def get_products(
     sort_key: str = Query("CREATED_AT", regex="^(CREATED_AT|UPDATED_AT|TITLE|PRICE|BEST_SELLING|RELEVANCE)$"),
     reverse: bool = False,
     min_price: Optional[float] = None,
-    max_price: Optional[float] = None
+    max_price: Optional[float] = None,
+    available: Optional[bool] = None,
+    view: str = Query("full", regex="^(card|detail|full)$"),
+    fields: Optional[str] = None
 ):
-    """Fetch products with filtering and search capabilities"""
-    
+    """Fetch products with filtering and search capabilities
+
+    `view` picks a smaller GraphQL selection (card, detail, full); `fields`
+    narrows it further to a comma-separated list of top-level product fields.
+    """
+    try:
+        selection = resolve_selection(view, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if search_query and not after:
+        search_popularity.record(search_query)
+
     # Build GraphQL query
     query_filters = []
     
     if collection_handle:
-        query_filters.append(f'collection:"{collection_handle}"')
+        query_filters.append(f'collection:"{shopify_search_term(collection_handle)}"')
     
     if search_query:
-        query_filters.append(f'title:*{search_query}* OR tag:*{search_query}*')
+        term = shopify_search_term(search_query)
+        query_filters.append(f'(title:*{term}* OR tag:*{term}*)')
         
     if min_price is not None:
         query_filters.append(f'variants.price:>={min_price}')
         
     if max_price is not None:
         query_filters.append(f'variants.price:<={max_price}')
+
+    if available is not None:
+        query_filters.append(f'available_for_sale:{str(available).lower()}')
     
     query_string = " AND ".join(query_filters) if query_filters else None
     
-    graphql_query = """
-    query getProducts($first: Int!, $after: String, $query: String, $sortKey: ProductSortKeys!, $reverse: Boolean!) {
-        products(first: $first, after: $after, query: $query, sortKey: $sortKey, reverse: $reverse) {
-            edges {
-                node {
-                    id
-                    title
-                    handle
-                    description
-                    vendor
-                    productType
-                    tags
-                    createdAt
-                    updatedAt
-                    images(first: 5) {
-                        edges {
-                            node {
-                                id
-                                url
-                                altText
-                                width
-                                height
-                            }
-                        }
-                    }
-                    variants(first: 10) {
-                        edges {
-                            node {
-                                id
-                                title
-                                price {
-                                    amount
-                                    currencyCode
-                                }
-                                compareAtPrice {
-                                    amount
-                                    currencyCode
-                                }
-                                availableForSale
-                                quantityAvailable
-                                selectedOptions {
-                                    name
-                                    value
-                                }
-                            }
-                        }
-                    }
-                }
-                cursor
-            }
-            pageInfo {
-                hasNextPage
-                hasPreviousPage
-                startCursor
-                endCursor
-            }
-        }
-    }
-    """
+    graphql_query = build_products_query(selection)
     
-    variables = {
-        "first": first,
-        "after": after,
-        "query": query_string,
-        "sortKey": sort_key,
-        "reverse": reverse
-    }
+    async def load_products(page_after=after, priority=Priority.BROWSE, max_wait=None):
+        if serve_from_mirror():
+            result = await catalog_sync.query_products(
+                first, page_after, collection_handle, search_query, sort_key, reverse, min_price, max_price,
+                available
+            )
+            result["products"] = [project_product(product, selection) for product in result["products"]]
+            return result
+        variables = {
+            "first": first,
+            "after": page_after,
+            "query": query_string,
+            "sortKey": sort_key,
+            "reverse": reverse
+        }
+        data = await shopify_graphql(graphql_query, variables, priority, max_wait)
+        nodes = [edge["node"] for edge in data["products"]["edges"]]
+        index_prices(nodes, selection)
+        return {
+            "products": nodes,
+            "pageInfo": data["products"]["pageInfo"],
+            "totalCount": len(data["products"]["edges"])
+        }
+
+    if serve_from_table(search_query, sort_key, after):
+        result = table_page(first, after, collection_handle, sort_key, reverse, min_price, max_price, available)
+        result["products"] = [project_product(product, selection) for product in result["products"]]
+        return result
+
+    if serve_from_index(search_query, after):
+        result = search_from_index(
+            first, after, collection_handle, search_query, sort_key, reverse, min_price, max_price, available
+        )
+        result["products"] = [project_product(product, selection) for product in result["products"]]
+        return result
+
+    cache_key = products_cache_key(
+        first, after, collection_handle, search_query, sort_key, reverse, min_price, max_price, available, selection
+    )
+    products_prefetcher.record_request(cache_key)
     
     try:
-        async with httpx.AsyncClient() as http_client:
-            response = await http_client.post(
-                f"https://{settings.SHOPIFY_STORE_DOMAIN}/api/{settings.SHOPIFY_API_VERSION}/graphql.json",
-                headers={
-                    "Content-Type": "application/json",
-                    "X-Shopify-Storefront-Access-Token": settings.SHOPIFY_STOREFRONT_ACCESS_TOKEN
-                },
-                json={"query": graphql_query, "variables": variables},
-                timeout=30.0
+        result = await products_cache.get_or_load(cache_key, load_products)
+
+        # Infinite scroll asks for the next page shortly after; warm it in the background
+        page_info = result["pageInfo"]
+        if settings.PRODUCTS_PREFETCH and not serve_from_mirror() and page_info.get("hasNextPage") \
+                and page_info.get("endCursor"):
+            end_cursor = page_info["endCursor"]
+            products_prefetcher.schedule(
+                products_cache_key(
+                    first, end_cursor, collection_handle, search_query, sort_key, reverse,
+                    min_price, max_price, available, selection
+                ),
+                lambda: load_products(end_cursor, Priority.BACKGROUND, 0.0)
             )
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Shopify API error: {response.text}"
-                )
-                
-            result = response.json()
-            
-            if "errors" in result:
-                raise HTTPException(status_code=400, detail=result["errors"])
-                
-            return {
-                "products": [edge["node"] for edge in result["data"]["products"]["edges"]],
-                "pageInfo": result["data"]["products"]["pageInfo"],
-                "totalCount": len(result["data"]["products"]["edges"])
-            }
+        return result
         
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ShopifyThrottled as e:
+        raise throttled_response(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/catalog/home")
+@http_cache(
+    max_age=settings.CATALOG_HOME_HTTP_MAX_AGE,
+    stale_while_revalidate=settings.CATALOG_HOME_HTTP_STALE_WHILE_REVALIDATE,
+    version=products_version
+)
+async def get_catalog_home(first: int = Query(12, ge=1, le=50)):
+    """Homepage grid cards (first image, first variant price and availability) from the products cache"""
+    page = await get_products(
+        first=first,
+        after=None,
+        collection_handle=None,
+        search_query=None,
+        sort_key="CREATED_AT",
+        reverse=False,
+        min_price=None,
+        max_price=None,
+        available=None,
+        view="card",
+        fields=None
+    )
+    return {"products": page["products"]}
+
+class ProductBatchRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=250)
+    view: str = Field("detail", pattern="^(card|detail|full)$")
+
+@api_router.post("/products/batch")
+async def get_products_batch(request: ProductBatchRequest):
+    """Products for up to 250 product ids, variant ids or handles, in request order
+
+    Cached and mirrored products are served locally; the rest are fetched in
+    one Storefront query (`nodes(ids:)` plus one aliased `product(handle:)`
+    per handle). A variant id resolves to its product.
+    """
+    selection = resolve_selection(request.view)
+    keys = list(dict.fromkeys(request.ids))
+    found: Dict[str, Dict[str, Any]] = {}
+    for key in keys:
+        product = local_product(key, selection)
+        if product is not None:
+            found[key] = product
+
+    ids = [key for key in keys if key not in found and key.startswith("gid://")]
+    handles = [key for key in keys if key not in found and not key.startswith("gid://")]
+    product_batch_stats["requests"] += 1
+    product_batch_stats["local_hits"] += len(found)
+    product_batch_stats["upstream_lookups"] += len(ids) + len(handles)
+
+    if ids or handles:
+        variables = {"ids": ids, **{f"h{i}": handle for i, handle in enumerate(handles)}}
+        try:
+            data = await shopify_graphql(build_batch_query(selection, len(handles)), variables)
+        except ShopifyThrottled as e:
+            raise throttled_response(e)
+        fetched = list(zip(ids, data["nodes"])) + [(handle, data.get(f"h{i}")) for i, handle in enumerate(handles)]
+        products: Dict[str, Dict[str, Any]] = {}
+        for key, node in fetched:
+            if not node:
+                continue
+            product = node.get("product", node)
+            found[key] = products[product["id"]] = product
+            product_nodes_cache.set((selection, key), product)
+            product_nodes_cache.set((selection, product["id"]), product)
+        index_prices(list(products.values()), selection)
+
+    product_batch_stats["not_found"] += len(keys) - len(found)
+    return {"products": [{"id": key, "product": found.get(key)} for key in request.ids]}
+
+@api_router.get("/facets")
+@http_cache(
+    max_age=settings.FACETS_HTTP_MAX_AGE,
+    stale_while_revalidate=settings.FACETS_HTTP_STALE_WHILE_REVALIDATE,
+    version=table_version
+)
+async def get_facets(
+    collection_handle: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    available: Optional[bool] = None,
+    vendor: Optional[str] = None,
+    product_type: Optional[str] = None,
+    tag: Optional[str] = None,
+    size: Optional[str] = None,
+    price_edges: Optional[str] = Query(None, description="Comma-separated bucket lower bounds"),
+    limit: int = Query(50, ge=1, le=500)
+):
+    """Vendor, product type, tag, size and price-bucket counts for the active filters"""
+    if not product_table.ready:
+        raise HTTPException(status_code=503, detail="Catalog facets are not loaded yet")
+    try:
+        edges = sorted(float(edge) for edge in price_edges.split(",")) if price_edges else DEFAULT_PRICE_EDGES
+    except ValueError:
+        raise HTTPException(status_code=400, detail="price_edges must be comma-separated numbers")
+    if not all(math.isfinite(edge) for edge in edges):
+        raise HTTPException(status_code=400, detail="price_edges must be finite numbers")
+    if len(edges) > MAX_PRICE_EDGES:
+        raise HTTPException(status_code=400, detail=f"price_edges accepts at most {MAX_PRICE_EDGES} values")
+    return facet_counts(
+        product_table,
+        collection_handle=collection_handle,
+        min_price=min_price,
+        max_price=max_price,
+        available=available,
+        vendor=vendor,
+        product_type=product_type,
+        tag=tag,
+        size=size,
+        price_edges=edges,
+        limit=limit
+    )
+
+@api_router.get("/suggest")
+@http_cache(
+    max_age=settings.SUGGEST_HTTP_MAX_AGE,
+    stale_while_revalidate=settings.SUGGEST_HTTP_STALE_WHILE_REVALIDATE,
+    version=suggest_version
+)
+async def get_suggestions(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(8, ge=1, le=MAX_SUGGESTIONS),
+    types: Optional[str] = Query(None, description="Comma-separated subset of product,tag,vendor,collection")
+):
+    """Prefix autocomplete over product titles, tags, vendors and collections"""
+    if not len(suggest_index):
+        raise HTTPException(status_code=503, detail="Suggestions are not loaded yet")
+    kinds = [kind.strip() for kind in types.split(",") if kind.strip()] if types else None
+    return {
+        "query": q,
+        "suggestions": [suggestion._asdict() for suggestion in suggest_index.lookup(q, limit, kinds)]
+    }
+
+# Catalog mirror endpoints
+async def run_catalog_sync(full: bool = False):
+    try:
+        stats = await catalog_sync.run(full=full)
+        await refresh_catalog_version()
+        search_index.ready = len(search_index) > 0
+        product_table.ready = len(product_table) > 0
+        logger.info(f"Catalog sync finished: {stats}")
+    except Exception as e:
+        logger.error(f"Catalog sync failed: {e}")
+
+@api_router.post("/catalog/sync", dependencies=[Depends(require_admin)])
+async def trigger_catalog_sync(full: bool = False):
+    """Start a catalog sync in the background"""
+    if catalog_sync is None:
+        raise HTTPException(status_code=503, detail="Database not available")
+    if catalog_sync.running:
+        raise HTTPException(status_code=409, detail="Catalog sync already running")
+    asyncio.create_task(run_catalog_sync(full=full))
+    return {"started": True, "full": full}
+
+@api_router.get("/catalog/sync")
+async def get_catalog_sync_status():
+    """Report the state of the catalog mirror"""
+    if catalog_sync is None:
+        raise HTTPException(status_code=503, detail="Database not available")
+    return {
+        "source": settings.CATALOG_SOURCE,
+        "running": catalog_sync.running,
+        "high_water_mark": await catalog_sync.high_water_mark(),
+        "last_run": catalog_sync.last_run
+    }
+
+# Admin endpoints
+@api_router.get("/admin/indexes", dependencies=[Depends(require_admin)])
+async def get_index_stats():
+    """Registered vs. existing indexes and their $indexStats usage"""
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database not available")
+    return {
+        "report": await index_report(db),
+        "usage": await index_usage(db)
+    }
+
+@api_router.post("/admin/reconcile", dependencies=[Depends(require_admin)])
+async def trigger_reconciliation():
+    """Run payment reconciliation now and return its result"""
+    if payment_reconciler is None:
+        raise HTTPException(status_code=503, detail="Database not available")
+    if payment_reconciler.running:
+        raise HTTPException(status_code=409, detail="Reconciliation already running")
+    return await payment_reconciler.run()
+
+@api_router.get("/metrics")
+async def get_metrics():
+    """Counters for background writers and workers"""
+    return {
+        "status_writes": status_write_buffer.stats() if status_write_buffer is not None else None,
+        "payment_events": payment_events.stats() if payment_events is not None else None,
+        "reconciliation": payment_reconciler.stats() if payment_reconciler is not None else None,
+        "idempotency": idempotency_store.stats() if idempotency_store is not None else None,
+        "shopify_budget": shopify_scheduler.stats(),
+        "shopify_single_flight": shopify_flights.stats()
+    }
+
+@api_router.get("/cache/stats")
+async def get_cache_stats():
+    """Hit/miss/eviction counters for the in-process caches"""
+    return {
+        "products": products_cache.stats(),
+        "products_prefetch": products_prefetcher.stats(),
+        "product_batch": {"entries": len(product_nodes_cache), **product_batch_stats},
+        "search_index": search_index.stats(),
+        "product_table": product_table.stats(),
+        "suggest": {**suggest_index.stats(), "generation": suggest_generation, "popularity": search_popularity.stats()},
+        "price_index": price_index.stats()
+    }
+
 # Root endpoint
 @api_router.get("/")
 async def root():
@@ -483,6 +1459,7 @@ app.add_middleware(
     ],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Configure logging
@@ -492,11 +1469,159 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def startup_http_client():
+    global shopify_http_client
+    shopify_http_client = build_shopify_http_client()
+
+@app.on_event("startup")
+async def startup_razorpay_client():
+    global razorpay_client
+    razorpay_client = build_razorpay_client()
+
+@app.on_event("startup")
+async def startup_indexes():
+    if db is None:
+        return
+    try:
+        result = await apply_indexes(db)
+        logger.info(f"Indexes applied: {len(result['applied'])}, failed: {list(result['failed'])}")
+        report = await index_report(db)
+        for collection, problems in report.items():
+            if problems["extra"] or problems["mismatched"]:
+                logger.warning(f"Unregistered or mismatched indexes on {collection}: {problems}")
+    except Exception as e:
+        logger.error(f"Index setup failed: {e}")
+
+@app.on_event("startup")
+async def startup_payment_events():
+    if payment_events is not None:
+        payment_events.start()
+
+@app.on_event("startup")
+async def startup_payment_reconciler():
+    global payment_reconciler_task
+    if payment_reconciler is not None and settings.RECONCILE_INTERVAL > 0:
+        payment_reconciler_task = asyncio.create_task(
+            payment_reconciler.run_forever(settings.RECONCILE_INTERVAL)
+        )
+
+@app.on_event("startup")
+async def startup_catalog_sync():
+    global catalog_sync_task, catalog_version_task
+    if catalog_sync is None:
+        return
+    if serve_from_mirror():
+        catalog_sync.add_listener(lambda docs: products_cache.invalidate())
+    catalog_sync.add_listener(search_index.upsert_many)
+    catalog_sync.add_listener(product_table.upsert_many)
+    catalog_sync.add_listener(price_index.update_products)
+    catalog_sync.add_listener(clear_catalog_version)
+    catalog_sync.add_removal_listener(remove_catalog_products)
+    catalog_sync.add_listener(schedule_suggest_rebuild)
+    asyncio.create_task(load_catalog_indexes())
+    if serve_from_mirror() and settings.CATALOG_VERSION_POLL_INTERVAL > 0:
+        catalog_version_task = asyncio.create_task(poll_mirror_version())
+    if settings.CATALOG_SYNC_INTERVAL > 0:
+        catalog_sync_task = asyncio.create_task(periodic_catalog_sync())
+
+def remove_catalog_products(product_ids: List[str]) -> None:
+    """Drop products a full sync swept from the mirror out of every in-memory index"""
+    for product_id in product_ids:
+        search_index.remove(product_id)
+        product_table.remove(product_id)
+        price_index.invalidate(product_id)
+    product_nodes_cache.invalidate()
+    if serve_from_mirror():
+        products_cache.invalidate()
+    clear_catalog_version()
+    schedule_suggest_rebuild()
+
+async def load_catalog_indexes():
+    global catalog_version, mirror_version
+    try:
+        version = await catalog_sync.version()
+        async for doc in catalog_sync.iter_documents():
+            search_index.upsert(doc)
+            product_table.upsert(doc)
+            price_index.update_products([doc])
+        search_index.ready = len(search_index) > 0
+        product_table.ready = len(product_table) > 0
+        if not catalog_sync.running:
+            catalog_version = mirror_version = version
+        try:
+            await search_popularity.refresh()
+        except Exception as e:
+            logger.error(f"Search popularity load failed: {e}")
+        await rebuild_suggest_index()
+        logger.info(f"Catalog indexes loaded: {search_index.stats()}, {price_index.stats()}")
+    except Exception as e:
+        logger.error(f"Catalog index load failed: {e}")
+
+async def periodic_catalog_sync():
+    while True:
+        if not catalog_sync.running:
+            await run_catalog_sync()
+        await asyncio.sleep(settings.CATALOG_SYNC_INTERVAL)
+
+@app.on_event("shutdown")
+async def shutdown_payment_reconciler():
+    if payment_reconciler_task is not None:
+        payment_reconciler_task.cancel()
+
+@app.on_event("startup")
+async def startup_search_popularity():
+    global suggest_popularity_task
+    if settings.SUGGEST_POPULARITY_INTERVAL > 0:
+        suggest_popularity_task = asyncio.create_task(refresh_suggest_popularity())
+
+@app.on_event("shutdown")
+async def shutdown_search_popularity():
+    if suggest_popularity_task is not None:
+        suggest_popularity_task.cancel()
+    try:
+        await search_popularity.flush()
+    except Exception as e:
+        logger.error(f"Search popularity flush failed: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_catalog_sync():
+    if catalog_sync_task is not None:
+        catalog_sync_task.cancel()
+    if catalog_version_task is not None:
+        catalog_version_task.cancel()
+    if suggest_rebuild_task is not None:
+        suggest_rebuild_task.cancel()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    if payment_events is not None:
+        await payment_events.stop()
+    if status_write_buffer is not None:
+        await status_write_buffer.close()
     if client:
         client.close()
 
+@app.on_event("shutdown")
+async def shutdown_http_client():
+    global shopify_http_client
+    shopify_scheduler.close()
+    if shopify_http_client is not None:
+        await shopify_http_client.aclose()
+        shopify_http_client = None
+
+@app.on_event("shutdown")
+async def shutdown_razorpay_client():
+    global razorpay_client
+    if razorpay_client is not None:
+        await razorpay_client.close()
+        razorpay_client = None
+
+@app.on_event("shutdown")
+async def shutdown_caches():
+    await products_prefetcher.close()
+    await products_cache.close()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=settings.PORT)
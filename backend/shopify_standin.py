@@ -0,0 +1,150 @@
+"""Local stand-in for the Shopify Storefront GraphQL endpoint with cost accounting
+
+Run with `uvicorn shopify_standin:app --port 9002` and point the backend at it
+with SHOPIFY_API_BASE_URL=http://localhost:9002/api/2024-01. Every response
+carries `extensions.cost` like Shopify's: queries are priced from their
+connection page sizes, a leaky bucket (STANDIN_MAX_COST, STANDIN_RESTORE_RATE)
+is charged per call and over-budget calls get a THROTTLED error.
+STANDIN_PRODUCTS sets the catalog size and STANDIN_LATENCY_MS adds delay.
+"""
+import asyncio
+import os
+import re
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import FastAPI
+
+LATENCY_MS = float(os.getenv("STANDIN_LATENCY_MS", 0))
+MAX_COST = float(os.getenv("STANDIN_MAX_COST", 1000))
+RESTORE_RATE = float(os.getenv("STANDIN_RESTORE_RATE", 50))
+PRODUCT_COUNT = int(os.getenv("STANDIN_PRODUCTS", 500))
+
+app = FastAPI(title="Shopify stand-in")
+
+bucket = {"available": MAX_COST, "updated": time.monotonic()}
+calls = {"served": 0, "throttled": 0}
+
+HANDLE_PATTERN = re.compile(r"(\w+): product\(handle: \$(\w+)\)")
+CONNECTION_PATTERN = re.compile(r"\w+\([^)]*?(?<![$\w])first:\s*(\$?\w+)")
+
+
+def query_cost(query: str, variables: Dict[str, Any]) -> int:
+    """Each connection costs 2 plus its page size; nested ones are charged per parent node"""
+    sizes = []
+    for first in CONNECTION_PATTERN.findall(query):
+        size = variables.get(first[1:]) if first.startswith("$") else first
+        sizes.append(int(size or 1))
+    if "nodes(ids:" in query:
+        sizes.insert(0, len(variables.get("ids") or []) + len(HANDLE_PATTERN.findall(query)))
+    if not sizes:
+        return 1
+    top, nested = sizes[0], sizes[1:]
+    # Capped so oversized queries still run, just slowly
+    return min(int(MAX_COST), 2 + top + top * sum(2 + size for size in nested))
+
+
+def throttle_status() -> Dict[str, float]:
+    return {"maximumAvailable": MAX_COST, "currentlyAvailable": bucket["available"], "restoreRate": RESTORE_RATE}
+
+
+def refill() -> None:
+    now = time.monotonic()
+    bucket["available"] = min(MAX_COST, bucket["available"] + (now - bucket["updated"]) * RESTORE_RATE)
+    bucket["updated"] = now
+
+
+def product(index: int) -> Dict[str, Any]:
+    price = 499 + (index * 37) % 4500
+    created = f"2024-{1 + index % 12:02d}-{1 + index % 28:02d}T10:00:00Z"
+    return {
+        "id": f"gid://shopify/Product/{index}",
+        "title": f"Standin Kurta {index}",
+        "handle": f"standin-kurta-{index}",
+        "description": "Stand-in product",
+        "vendor": ["Undhyu", "Banaras Looms", "Jaipur Prints"][index % 3],
+        "productType": ["Kurta", "Saree", "Lehenga"][index % 3],
+        "tags": ["cotton", "festive"] if index % 2 else ["silk"],
+        "createdAt": created,
+        "updatedAt": created,
+        "collections": {"edges": [{"node": {"handle": "new-arrivals" if index % 2 else "sarees"}}]},
+        "images": {"edges": [{"node": {
+            "id": f"gid://shopify/ProductImage/{index}",
+            "url": f"https://cdn.example.com/{index}.jpg",
+            "altText": None, "width": 800, "height": 1000
+        }}]},
+        "variants": {"edges": [{"node": {
+            "id": f"gid://shopify/ProductVariant/{index}{size}",
+            "title": size,
+            "price": {"amount": f"{price}.0", "currencyCode": "INR"},
+            "compareAtPrice": None,
+            "availableForSale": index % 7 != 0,
+            "quantityAvailable": 5,
+            "selectedOptions": [{"name": "Size", "value": size}]
+        }} for size in ("S", "M", "L")]}
+    }
+
+
+catalog = [product(index) for index in range(PRODUCT_COUNT)]
+by_id: Dict[str, Dict[str, Any]] = {}
+by_handle = {item["handle"]: item for item in catalog}
+for item in catalog:
+    by_id[item["id"]] = item
+    for edge in item["variants"]["edges"]:
+        by_id[edge["node"]["id"]] = {**edge["node"], "product": {"id": item["id"]}}
+
+
+def products_page(variables: Dict[str, Any]) -> Dict[str, Any]:
+    first = int(variables.get("first") or 20)
+    start = int(variables["after"]) if variables.get("after") else 0
+    page = catalog[start:start + first]
+    return {
+        "edges": [{"node": node, "cursor": str(start + i + 1)} for i, node in enumerate(page)],
+        "pageInfo": {
+            "hasNextPage": start + first < len(catalog),
+            "hasPreviousPage": start > 0,
+            "startCursor": str(start + 1) if page else None,
+            "endCursor": str(start + len(page)) if page else None
+        }
+    }
+
+
+@app.post("/api/{version}/graphql.json")
+async def graphql(payload: Dict[str, Any]):
+    if LATENCY_MS:
+        await asyncio.sleep(LATENCY_MS / 1000)
+    query: str = payload["query"]
+    variables: Dict[str, Any] = payload.get("variables") or {}
+    requested = query_cost(query, variables)
+
+    refill()
+    if requested > bucket["available"]:
+        calls["throttled"] += 1
+        return {
+            "errors": [{"message": "Throttled", "extensions": {"code": "THROTTLED"}}],
+            "extensions": {"cost": {"requestedQueryCost": requested, "throttleStatus": throttle_status()}}
+        }
+    bucket["available"] -= requested
+    calls["served"] += 1
+
+    data: Dict[str, Optional[Any]] = {}
+    if "nodes(ids:" in query:
+        data["nodes"] = [by_id.get(node_id) for node_id in variables.get("ids") or []]
+        for alias, variable in HANDLE_PATTERN.findall(query):
+            data[alias] = by_handle.get(variables.get(variable))
+    elif "products(" in query:
+        data["products"] = products_page(variables)
+    return {
+        "data": data,
+        "extensions": {"cost": {
+            "requestedQueryCost": requested,
+            "actualQueryCost": requested,
+            "throttleStatus": throttle_status()
+        }}
+    }
+
+
+@app.get("/_standin/stats")
+async def stats() -> Dict[str, Any]:
+    refill()
+    return {**calls, "bucket": throttle_status()}
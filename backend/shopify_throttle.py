@@ -0,0 +1,193 @@
+import asyncio
+import hashlib
+import heapq
+import itertools
+import math
+import time
+from enum import IntEnum
+from typing import Any, Callable, Dict, List, Optional
+
+
+class Priority(IntEnum):
+    CRITICAL = 0    # checkout price checks
+    BROWSE = 1      # shopper-facing listing pages
+    BACKGROUND = 2  # catalog sync, prefetch
+
+
+class ShopifyThrottled(Exception):
+    """A call was shed (or throttled upstream) to protect the query-cost budget"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def query_key(query: str) -> str:
+    return hashlib.sha1(query.encode()).hexdigest()
+
+
+class CostScheduler:
+    """Token-bucket model of Shopify's GraphQL query-cost budget
+
+    Each call reserves its estimated cost before it is sent; the estimate is
+    the `requestedQueryCost` Shopify reported last time for the same query.
+    `extensions.cost.throttleStatus` on every response resyncs the bucket
+    (available, maximum, restore rate). Calls that can't be served at once
+    queue by priority. Lower priorities must leave a reserve in the bucket
+    and give up after `max_wait`, so browse and background traffic is shed
+    before checkout ever sees a THROTTLED error.
+    """
+
+    def __init__(
+        self,
+        capacity: float = 1000.0,
+        restore_rate: float = 50.0,
+        default_cost: float = 50.0,
+        reserves: Optional[Dict[Priority, float]] = None,
+        max_waits: Optional[Dict[Priority, float]] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.capacity = capacity
+        self.restore_rate = restore_rate
+        self.default_cost = default_cost
+        # Fraction of capacity each priority must leave untouched
+        self.reserves = reserves or {Priority.CRITICAL: 0.0, Priority.BROWSE: 0.1, Priority.BACKGROUND: 0.5}
+        self.max_waits = max_waits or {Priority.CRITICAL: math.inf, Priority.BROWSE: 2.0, Priority.BACKGROUND: 30.0}
+        self._clock = clock
+        self.available = capacity
+        self._updated = clock()
+        self.costs: Dict[str, float] = {}
+        self._waiters: List[list] = []
+        self._sequence = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self.granted = {priority.name.lower(): 0 for priority in Priority}
+        self.shed = {priority.name.lower(): 0 for priority in Priority}
+        self.throttled = 0
+        self.wait_seconds = 0.0
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.available = min(self.capacity, self.available + (now - self._updated) * self.restore_rate)
+        self._updated = now
+
+    def estimate(self, query: str) -> float:
+        return self.costs.get(query_key(query), self.default_cost)
+
+    def _floor(self, priority: Priority) -> float:
+        return self.capacity * self.reserves[priority]
+
+    def _queued_cost(self, priority: Priority) -> float:
+        return sum(entry[3] for entry in self._waiters if entry[0] <= priority and not entry[2].done())
+
+    def expected_wait(self, cost: float, priority: Priority) -> float:
+        """Seconds until `cost` could be granted at `priority` behind the current queue"""
+        self._refill()
+        deficit = cost + self._floor(priority) + self._queued_cost(priority) - self.available
+        return max(0.0, deficit) / self.restore_rate if self.restore_rate else float("inf")
+
+    def low_budget(self, fraction: float = 0.5) -> bool:
+        self._refill()
+        return self.available < self.capacity * fraction
+
+    async def acquire(self, cost: float, priority: Priority = Priority.BROWSE, max_wait: Optional[float] = None) -> None:
+        """Reserve `cost` points, queueing behind higher priorities; raise ShopifyThrottled when shed"""
+        if max_wait is None:
+            max_wait = self.max_waits[priority]
+        name = priority.name.lower()
+        # Never ask for more than the bucket can ever hold
+        cost = min(cost, self.capacity)
+
+        wait = self.expected_wait(cost, priority)
+        if wait == 0.0:
+            self.available -= cost
+            self.granted[name] += 1
+            return
+        if wait > max_wait:
+            self.shed[name] += 1
+            raise ShopifyThrottled(f"Shopify budget too low for {name} request", retry_after=wait)
+
+        started = self._clock()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, [priority, next(self._sequence), future, cost])
+        # Restart the dispatcher so it re-evaluates the (possibly new) head of the queue
+        if self._dispatcher is not None and not self._dispatcher.done():
+            self._dispatcher.cancel()
+        self._dispatcher = asyncio.create_task(self._dispatch())
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=None if math.isinf(max_wait) else max_wait)
+        except asyncio.TimeoutError:
+            if not future.done():
+                future.cancel()
+                self.shed[name] += 1
+                raise ShopifyThrottled(f"Timed out waiting for Shopify budget ({name})", retry_after=wait)
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as we were cancelled; give the points back
+                self.available += cost
+            future.cancel()
+            raise
+        self.granted[name] += 1
+        self.wait_seconds += self._clock() - started
+
+    async def _dispatch(self) -> None:
+        while self._waiters:
+            priority, _, future, cost = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            self._refill()
+            deficit = cost + self._floor(priority) - self.available
+            if deficit <= 0:
+                heapq.heappop(self._waiters)
+                self.available -= cost
+                future.set_result(None)
+                continue
+            await asyncio.sleep(deficit / self.restore_rate if self.restore_rate else 1.0)
+
+    def settle(self, query: str, reserved: float, extensions: Optional[Dict[str, Any]]) -> None:
+        """Resync the bucket from a response's `extensions.cost`"""
+        cost = (extensions or {}).get("cost")
+        if not cost:
+            return
+        if cost.get("requestedQueryCost") is not None:
+            self.costs[query_key(query)] = float(cost["requestedQueryCost"])
+        status = cost.get("throttleStatus")
+        if status:
+            self.capacity = float(status.get("maximumAvailable", self.capacity))
+            self.restore_rate = float(status.get("restoreRate", self.restore_rate))
+            self.available = float(status["currentlyAvailable"])
+            self._updated = self._clock()
+        elif cost.get("actualQueryCost") is not None:
+            # Refund the difference between the reservation and the real cost
+            self.available = min(self.capacity, self.available + reserved - float(cost["actualQueryCost"]))
+
+    def record_throttled(self, extensions: Optional[Dict[str, Any]]) -> float:
+        """Account for an upstream THROTTLED response; returns seconds until it would fit"""
+        self.throttled += 1
+        cost = (extensions or {}).get("cost") or {}
+        status = cost.get("throttleStatus")
+        self.available = float(status["currentlyAvailable"]) if status else 0.0
+        self._updated = self._clock()
+        requested = cost.get("requestedQueryCost") or self.default_cost
+        return max(0.0, float(requested) - self.available) / self.restore_rate if self.restore_rate else 1.0
+
+    def close(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+        for entry in self._waiters:
+            entry[2].cancel()
+        self._waiters.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill()
+        return {
+            "available": round(self.available, 1),
+            "capacity": self.capacity,
+            "restore_rate": self.restore_rate,
+            "queued": sum(1 for entry in self._waiters if not entry[2].done()),
+            "granted": dict(self.granted),
+            "shed": dict(self.shed),
+            "throttled": self.throttled,
+            "wait_seconds": round(self.wait_seconds, 3),
+            "known_query_costs": len(self.costs)
+        }
@@ -0,0 +1,152 @@
+import re
+from bisect import bisect_left
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+PRECOMPUTED_PREFIX_LENGTH = 2
+MAX_SUGGESTIONS = 20
+SUGGESTION_TYPES = ("product", "tag", "vendor", "collection")
+
+
+def normalize_text(value: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", value.lower()).split())
+
+
+def collection_title(handle: str) -> str:
+    return handle.replace("-", " ").replace("_", " ").title()
+
+
+class Suggestion(NamedTuple):
+    text: str
+    type: str
+    value: str
+
+
+class SuggestIndex:
+    """Immutable prefix index over product titles, tags, vendors and collections
+
+    Every word-start suffix of a suggestion ("banarasi silk saree", "silk
+    saree", "saree") is a key in one sorted array, so a prefix is a bisect
+    range. Results are ranked by weight: catalog frequency (products per tag,
+    vendor or collection; availability for titles) plus search popularity.
+    Top results for the short, very broad prefixes are precomputed. Build a
+    new index and swap the reference to update it; lookups never see a
+    half-built index.
+    """
+
+    def __init__(self, suggestions: List[Suggestion], weights: List[float]):
+        self.suggestions = suggestions
+        self.weights = np.asarray(weights, dtype=np.float64)
+        keyed: List[Tuple[str, int]] = []
+        for index, suggestion in enumerate(suggestions):
+            words = normalize_text(suggestion.text).split()
+            keyed.extend((" ".join(words[start:]), index) for start in range(len(words)))
+        keyed.sort()
+        self.keys = [key for key, _ in keyed]
+        self.key_entries = np.fromiter((index for _, index in keyed), dtype=np.int64, count=len(keyed))
+        kind_codes = {kind: code for code, kind in enumerate(SUGGESTION_TYPES)}
+        entry_kinds = np.fromiter((kind_codes[suggestion.type] for suggestion in suggestions), dtype=np.int8,
+                                  count=len(suggestions))
+        self.key_kinds = entry_kinds[self.key_entries]
+        # Weight first, earlier key wins ties: a total order argpartition can select on
+        self.key_scores = self.weights[self.key_entries] * (len(keyed) + 1) - np.arange(len(keyed))
+
+        self._top: Dict[Tuple[str, Optional[int]], List[int]] = {}
+        prefixes = sorted({key[:length] for key in self.keys for length in range(1, PRECOMPUTED_PREFIX_LENGTH + 1)})
+        for prefix in prefixes:
+            low, high = self._range(prefix)
+            self._top[(prefix, None)] = self._rank(low, high, MAX_SUGGESTIONS)
+            for code in range(len(SUGGESTION_TYPES)):
+                self._top[(prefix, code)] = self._rank(low, high, MAX_SUGGESTIONS, [code])
+
+    def __len__(self) -> int:
+        return len(self.suggestions)
+
+    @classmethod
+    def build(cls, docs: Iterable[Mapping[str, Any]], popularity: Optional[Mapping[str, float]] = None) -> "SuggestIndex":
+        """Index catalog documents; `popularity` maps normalized text to a search count"""
+        popularity = popularity or {}
+        counts: Counter = Counter()
+        suggestions: Dict[Tuple[str, str], Suggestion] = {}
+        for doc in docs:
+            title = doc.get("title")
+            if title:
+                key = ("product", doc["_id"])
+                suggestions[key] = Suggestion(title, "product", doc.get("handle") or doc["_id"])
+                counts[key] += 2 if doc.get("available") else 1
+            collection_titles = doc.get("collection_titles") or {}
+            for kind, values in (
+                ("tag", doc.get("tags") or []),
+                ("vendor", [doc["vendor"]] if doc.get("vendor") else []),
+                ("collection", doc.get("collections") or []),
+            ):
+                for value in values:
+                    key = (kind, value.lower())
+                    if kind == "collection":
+                        # A collection without a title is shown by its handle
+                        text = collection_titles.get(value) or collection_title(value)
+                    else:
+                        text = value
+                    suggestions.setdefault(key, Suggestion(text, kind, value))
+                    counts[key] += 1
+
+        ordered = list(suggestions.items())
+        weights = [counts[key] + popularity.get(normalize_text(suggestion.text), 0) for key, suggestion in ordered]
+        return cls([suggestion for _, suggestion in ordered], weights)
+
+    def _range(self, prefix: str) -> Tuple[int, int]:
+        low = bisect_left(self.keys, prefix)
+        return low, bisect_left(self.keys, prefix + "\uffff", low)
+
+    def _rank(self, low: int, high: int, limit: int, kind_codes: Optional[List[int]] = None) -> List[int]:
+        """Distinct suggestions for keys[low:high], best first"""
+        scores = self.key_scores[low:high]
+        entries = self.key_entries[low:high]
+        if kind_codes is not None:
+            matches = np.isin(self.key_kinds[low:high], kind_codes)
+            scores, entries = scores[matches], entries[matches]
+        # One suggestion can own several matching keys ("silk saree silk"), so
+        # over-select and widen until enough distinct suggestions survive
+        take = limit * 2
+        while True:
+            if len(scores) > take:
+                picked = np.argpartition(-scores, take - 1)[:take]
+                picked = picked[np.argsort(-scores[picked])]
+            else:
+                picked = np.argsort(-scores)
+            ranked = list(dict.fromkeys(entries[picked].tolist()))
+            if len(ranked) >= limit or len(picked) == len(scores):
+                return ranked[:limit]
+            take *= 4
+
+    def lookup(self, prefix: str, limit: int = 10, kinds: Optional[Iterable[str]] = None) -> List[Suggestion]:
+        """Top `limit` suggestions with a word starting with `prefix`; `kinds` restricts the types"""
+        prefix = normalize_text(prefix)
+        if not prefix:
+            return []
+        limit = min(limit, MAX_SUGGESTIONS)
+        kind_codes = sorted({SUGGESTION_TYPES.index(kind) for kind in kinds if kind in SUGGESTION_TYPES}) \
+            if kinds else None
+        if kind_codes == []:
+            return []
+
+        if len(prefix) <= PRECOMPUTED_PREFIX_LENGTH:
+            if kind_codes is None:
+                ids = self._top.get((prefix, None), [])
+            else:
+                # The best of a union of types is among the best of each type
+                merged = {index for code in kind_codes for index in self._top.get((prefix, code), [])}
+                ids = sorted(merged, key=lambda index: (-self.weights[index], self.suggestions[index].text))
+        else:
+            low, high = self._range(prefix)
+            ids = self._rank(low, high, limit, kind_codes)
+        return [self.suggestions[index] for index in ids[:limit]]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "suggestions": len(self.suggestions),
+            "keys": len(self.keys),
+            "precomputed_prefixes": len(self._top) // (len(SUGGESTION_TYPES) + 1)
+        }
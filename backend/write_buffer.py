@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBuffer:
+    """Coalesce single-document inserts into `insert_many` batches
+
+    Documents are flushed when `max_batch` are pending or `max_delay` seconds
+    after the first pending one, whichever comes first. At most `max_pending`
+    documents are held; beyond that `add` waits for a flush (backpressure)
+    instead of growing without bound.
+    """
+
+    def __init__(
+        self,
+        collection,
+        max_batch: int = 500,
+        max_delay: float = 0.25,
+        max_pending: int = 10000
+    ):
+        self.collection = collection
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self._pending: List[Dict[str, Any]] = []
+        self._space = asyncio.Condition()
+        self._flush_lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._closed = False
+        self.batches = 0
+        self.documents = 0
+        self.failed_documents = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+        self.last_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    async def add(self, document: Dict[str, Any]) -> None:
+        if self._closed:
+            raise RuntimeError("Write buffer is closed")
+        async with self._space:
+            await self._space.wait_for(lambda: len(self._pending) < self.max_pending)
+            self._pending.append(document)
+            pending = len(self._pending)
+
+        if pending >= self.max_batch:
+            task = asyncio.create_task(self.flush())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        elif self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.max_delay)
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Write everything pending, one insert_many per batch"""
+        async with self._flush_lock:
+            while self._pending:
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+                async with self._space:
+                    self._space.notify_all()
+
+                started = time.perf_counter()
+                try:
+                    await self.collection.insert_many(batch, ordered=False)
+                except Exception as e:
+                    self.failed_documents += len(batch)
+                    logger.error(f"Buffered insert of {len(batch)} documents failed: {e}")
+                elapsed_ms = (time.perf_counter() - started) * 1000
+
+                self.batches += 1
+                self.documents += len(batch)
+                self.last_batch_size = len(batch)
+                self.max_batch_size = max(self.max_batch_size, len(batch))
+                self.last_flush_ms = elapsed_ms
+                self.total_flush_ms += elapsed_ms
+
+    async def close(self) -> None:
+        """Stop accepting documents and flush what is left"""
+        self._closed = True
+        # Let scheduled flushes finish; cancelling one mid-insert would drop its batch
+        tasks = list(self._tasks)
+        if self._timer is not None:
+            tasks.append(self._timer)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "documents": self.documents,
+            "failed_documents": self.failed_documents,
+            "last_batch_size": self.last_batch_size,
+            "max_batch_size": self.max_batch_size,
+            "avg_batch_size": self.documents / self.batches if self.batches else 0.0,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "avg_flush_ms": round(self.total_flush_ms / self.batches, 3) if self.batches else 0.0
+        }
@@ -11,7 +11,6 @@ function App() {
 
   // Configuration
   const SHOPIFY_DOMAIN = 'j0dktb-z1.myshopify.com';
-  const STOREFRONT_ACCESS_TOKEN = 'eeae7a5247421a8b8a14711145ecd93b'; // Fixed token
   const RAZORPAY_KEY_ID = 'rzp_live_NIogFPd28THyOF'; // Your live key
   const API_BASE_URL = process.env.REACT_APP_BACKEND_URL || '/api';
 
@@ -44,63 +43,14 @@ function App() {
     }
   ];
 
-  // Fetch products from Shopify
-  const fetchShopifyProducts = async () => {
-    const query = `
-      {
-        products(first: 12) {
-          edges {
-            node {
-              id
-              title
-              handle
-              description
-              images(first: 1) {
-                edges {
-                  node {
-                    url
-                    altText
-                  }
-                }
-              }
-              variants(first: 1) {
-                edges {
-                  node {
-                    id
-                    price {
-                      amount
-                      currencyCode
-                    }
-                    compareAtPrice {
-                      amount
-                      currencyCode
-                    }
-                    availableForSale
-                  }
-                }
-              }
-              vendor
-              productType
-            }
-          }
-        }
-      }
-    `;
-
+  // Fetch the homepage grid from the backend catalog cache
+  const fetchCatalogProducts = async () => {
     try {
-      const response = await fetch(`https://${SHOPIFY_DOMAIN}/api/2024-01/graphql.json`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-          'X-Shopify-Storefront-Access-Token': STOREFRONT_ACCESS_TOKEN,
-        },
-        body: JSON.stringify({ query }),
-      });
-
+      const response = await fetch(`${API_BASE_URL}/catalog/home?first=12`);
       const data = await response.json();
       
-      if (data.data && data.data.products) {
-        setProducts(data.data.products.edges.map(edge => edge.node));
+      if (response.ok && data.products) {
+        setProducts(data.products);
       }
     } catch (error) {
       console.error('Error fetching products:', error);
@@ -110,7 +60,7 @@ function App() {
   };
 
   useEffect(() => {
-    fetchShopifyProducts();
+    fetchCatalogProducts();
   }, []);
 
   // Auto-rotate hero images
@@ -0,0 +1,110 @@
+"""order_transition and PaymentEventProcessor against an in-memory MongoDB"""
+import asyncio
+import sys
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from payment_events import PaymentEventProcessor, order_transition  # noqa: E402
+
+ORDER_ID = "order_test0001"
+
+
+def event(kind, payment_id, status):
+    payment = {"id": payment_id, "order_id": ORDER_ID, "status": status, "amount": 49900}
+    if status == "failed":
+        payment["error_description"] = "Payment declined"
+    return {"entity": "event", "event": kind, "payload": {"payment": {"entity": payment}}}
+
+
+CAPTURED = event("payment.captured", "pay_ok", "captured")
+FAILED = event("payment.failed", "pay_fail", "failed")
+
+
+@pytest.fixture
+def db():
+    db = AsyncMongoMockClient()[f"test_{uuid.uuid4().hex}"]
+    asyncio.run(db.orders.insert_one({
+        "razorpay_order_id": ORDER_ID, "status": "created", "created_at": datetime.utcnow()
+    }))
+    return db
+
+
+def order(db):
+    return asyncio.run(db.orders.find_one({"razorpay_order_id": ORDER_ID}))
+
+
+def deliver(db, *deliveries):
+    """Feed (event_id, event) pairs through the queue and its workers"""
+    processor = PaymentEventProcessor(db, workers=2)
+
+    async def run():
+        processor.start()
+        accepted = [processor.submit(event_id, body) for event_id, body in deliveries]
+        await processor.stop()
+        return accepted
+
+    return processor, asyncio.run(run())
+
+
+def test_transition_ignores_events_without_an_order():
+    assert order_transition({"event": "payment.captured", "payload": {}}) is None
+
+
+def test_failed_attempt_keeps_the_order_open():
+    transition = order_transition(FAILED)
+    assert transition["filter"]["status"] == "created"
+    assert "status" not in transition["update"]["$set"]
+
+
+def test_duplicate_delivery_is_applied_once(db):
+    processor, accepted = deliver(db, ("evt_1", CAPTURED), ("evt_1", CAPTURED))
+
+    assert accepted == [True, False]
+    assert processor.applied == 1
+    assert processor.duplicates == 1
+    assert order(db)["status"] == "paid"
+
+
+def test_duplicate_delivery_across_workers_is_deduped_in_mongodb(db):
+    processor = PaymentEventProcessor(db)
+    asyncio.run(processor.process("evt_1", CAPTURED))
+    # A second worker that never saw the id in its in-memory LRU
+    other = PaymentEventProcessor(db)
+    asyncio.run(other.process("evt_1", CAPTURED))
+
+    assert processor.applied == 1
+    assert other.duplicates == 1
+
+
+def test_late_failure_cannot_undo_a_capture(db):
+    processor, _ = deliver(db, ("evt_1", CAPTURED), ("evt_2", FAILED))
+
+    stored = order(db)
+    assert stored["status"] == "paid"
+    assert stored["razorpay_payment_id"] == "pay_ok"
+    assert "failed_payment_id" not in stored
+    assert processor.applied == 1
+    assert processor.ignored == 1
+
+
+def test_failed_then_captured_ends_paid(db):
+    processor, _ = deliver(db, ("evt_1", FAILED))
+    stored = order(db)
+    assert stored["status"] == "created"
+    assert stored["failed_payment_id"] == "pay_fail"
+    assert stored["failed_attempts"] == 1
+
+    # The same attempt seen again (e.g. by the reconciler) is not recounted
+    deliver(db, ("evt_3", FAILED))
+    assert order(db)["failed_attempts"] == 1
+
+    deliver(db, ("evt_2", CAPTURED))
+    stored = order(db)
+    assert stored["status"] == "paid"
+    assert stored["razorpay_payment_id"] == "pay_ok"
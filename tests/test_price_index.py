@@ -0,0 +1,93 @@
+"""PriceIndex quoting and freshness"""
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from price_index import PriceIndex  # noqa: E402
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def product(product_id, *variants):
+    return {
+        "id": product_id,
+        "variants": {"edges": [{"node": {
+            "id": variant_id,
+            "price": {"amount": str(amount), "currencyCode": "INR"},
+            "availableForSale": available
+        }} for variant_id, amount, available in variants]}
+    }
+
+
+def index(clock=None):
+    prices = PriceIndex(max_age=60, clock=clock or Clock())
+    prices.update_products([
+        product("p1", ("v1", 499.0, True), ("v2", 599.0, True)),
+        product("p2", ("v3", 1299.5, False))
+    ])
+    return prices
+
+
+def test_quote_totals_in_paise():
+    total, problems = index().quote([("v1", 2, 499.0), ("p1", 1, 499.0)], "INR")
+
+    assert problems == []
+    assert total == 3 * 49900
+
+
+def test_quote_reports_each_problem():
+    total, problems = index().quote([
+        ("v2", 1, 549.0),
+        ("v3", 1, 1299.5),
+        ("v1", 0, 499.0),
+        ("nope", 1, 10.0)
+    ], "INR")
+
+    assert [(problem.item_id, problem.reason) for problem in problems] == [
+        ("v2", "price changed to 599.00"),
+        ("v3", "not available for sale"),
+        ("v1", "invalid quantity"),
+        ("nope", "unknown item")
+    ]
+    assert total == 59900 + 129950
+
+
+def test_quote_rejects_other_currencies():
+    _, problems = index().quote([("v1", 1, 499.0)], "USD")
+
+    assert [problem.reason for problem in problems] == ["priced in INR"]
+
+
+def test_missing_lists_unknown_and_stale_items_once():
+    clock = Clock()
+    prices = index(clock)
+    assert prices.missing(["v1", "p2", "nope", "nope"]) == ["nope"]
+
+    clock.now += 61
+    prices.update_products([product("p2", ("v3", 1299.5, True))])
+    assert prices.missing(["v1", "p1", "p2", "v3"]) == ["v1", "p1"]
+
+
+def test_missing_ages_catalog_documents_from_synced_at():
+    prices = PriceIndex(max_age=60, clock=Clock())
+    stale = product("p1", ("v1", 499.0, True))
+    stale["synced_at"] = datetime.utcnow() - timedelta(minutes=5)
+    prices.update_products([stale])
+
+    assert prices.missing(["v1"]) == ["v1"]
+
+
+def test_removed_variants_are_dropped():
+    prices = index()
+    prices.update_products([product("p1", ("v2", 599.0, True))])
+
+    assert prices.missing(["v1", "v2", "p1"]) == ["v1"]
+    assert prices.lookup("p1").price == 599.0
@@ -0,0 +1,59 @@
+"""PaymentReconciler against the Razorpay stand-in and an in-memory MongoDB"""
+import asyncio
+import sys
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import razorpay_standin  # noqa: E402
+from razorpay_async import AsyncRazorpayClient  # noqa: E402
+from reconciliation import PaymentReconciler  # noqa: E402
+
+
+@pytest.fixture
+def standin(monkeypatch):
+    monkeypatch.setattr(razorpay_standin, "orders", {})
+    monkeypatch.setattr(razorpay_standin, "payments", {})
+    return httpx.ASGITransport(app=razorpay_standin.app)
+
+
+def test_failed_attempt_then_capture_is_reconciled(standin):
+    db = AsyncMongoMockClient()[f"test_{uuid.uuid4().hex}"]
+
+    async def scenario():
+        client = AsyncRazorpayClient("key", "secret", base_url="http://razorpay/v1", transport=standin)
+        reconciler = PaymentReconciler(db, lambda: client, min_age=timedelta(0), max_requests_per_second=0)
+        order = await client.create_order({"amount": 49900, "currency": "INR"})
+        await db.orders.insert_one({
+            "razorpay_order_id": order["id"],
+            "status": "created",
+            "created_at": datetime.utcnow() - timedelta(minutes=1)
+        })
+
+        async with httpx.AsyncClient(transport=standin, base_url="http://razorpay/v1") as shopper:
+            await shopper.post("/_standin/payments", json={"order_id": order["id"], "status": "failed"})
+            first = await reconciler.run()
+            after_failure = await db.orders.find_one({"razorpay_order_id": order["id"]})
+
+            # Retry on the same order succeeds, but its webhook never arrives
+            await shopper.post("/_standin/payments", json={"order_id": order["id"], "status": "captured"})
+            second = await reconciler.run()
+            after_capture = await db.orders.find_one({"razorpay_order_id": order["id"]})
+
+        await client.close()
+        return first, after_failure, second, after_capture
+
+    first, after_failure, second, after_capture = asyncio.run(scenario())
+
+    assert first["failed_attempts"] == 1
+    assert after_failure["status"] == "created"
+    assert after_failure["failed_attempts"] == 1
+    assert second["orders"] == 1
+    assert second["paid"] == 1
+    assert after_capture["status"] == "paid"
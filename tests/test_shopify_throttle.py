@@ -0,0 +1,106 @@
+"""CostScheduler and send_shopify_graphql against the local Shopify stand-in"""
+import asyncio
+import math
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server  # noqa: E402
+import shopify_standin  # noqa: E402
+from shopify_throttle import CostScheduler, Priority, ShopifyThrottled  # noqa: E402
+
+CAPACITY = 200.0
+RESTORE_RATE = 50.0
+# 2 + 40 per call against the stand-in's pricing
+QUERY = "query page($first: Int!) { products(first: $first) { edges { node { id } } } }"
+VARIABLES = {"first": 40}
+
+
+@pytest.fixture
+def standin(monkeypatch):
+    """Small, full stand-in bucket and a scheduler/client wired to it"""
+    monkeypatch.setattr(shopify_standin, "MAX_COST", CAPACITY)
+    monkeypatch.setattr(shopify_standin, "RESTORE_RATE", RESTORE_RATE)
+    monkeypatch.setattr(shopify_standin, "bucket", {"available": CAPACITY, "updated": time.monotonic()})
+    monkeypatch.setattr(shopify_standin, "calls", {"served": 0, "throttled": 0})
+    scheduler = CostScheduler(
+        capacity=CAPACITY,
+        restore_rate=RESTORE_RATE,
+        max_waits={Priority.CRITICAL: math.inf, Priority.BROWSE: 0.2, Priority.BACKGROUND: 5.0}
+    )
+    monkeypatch.setattr(server, "shopify_scheduler", scheduler)
+    return scheduler
+
+
+async def drive(scheduler, body):
+    server.shopify_http_client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=shopify_standin.app),
+        base_url="http://shopify-standin/api/2024-01"
+    )
+    try:
+        return await body()
+    finally:
+        scheduler.close()
+        await server.shopify_http_client.aclose()
+        server.shopify_http_client = None
+
+
+def test_browse_is_shed_before_shopify_throttles(standin):
+    async def body():
+        served = shed = 0
+        for _ in range(20):
+            try:
+                await server.send_shopify_graphql(QUERY, VARIABLES, Priority.BROWSE, None)
+                served += 1
+            except ShopifyThrottled as e:
+                assert e.retry_after > 0
+                shed += 1
+        return served, shed
+
+    served, shed = asyncio.run(drive(standin, body))
+
+    assert served >= 1
+    assert shed >= 1
+    assert standin.stats()["shed"].get("browse", 0) == shed
+    assert shopify_standin.calls["throttled"] == 0
+    assert shopify_standin.calls["served"] == served
+
+
+def test_critical_waits_for_budget_instead_of_failing(standin):
+    async def body():
+        # Drain the bucket with browse traffic until it starts being shed
+        for _ in range(20):
+            try:
+                await server.send_shopify_graphql(QUERY, VARIABLES, Priority.BROWSE, None)
+            except ShopifyThrottled:
+                break
+        return await asyncio.gather(*(
+            server.send_shopify_graphql(QUERY, VARIABLES, Priority.CRITICAL, None) for _ in range(5)
+        ))
+
+    results = asyncio.run(drive(standin, body))
+
+    assert all(len(data["products"]["edges"]) == 40 for data in results)
+    assert shopify_standin.calls["throttled"] == 0
+    assert standin.stats()["shed"].get("critical", 0) == 0
+
+
+def test_critical_joiner_outlives_a_shed_background_call(standin):
+    async def body():
+        standin.available = 0.0
+        background = asyncio.create_task(server.shopify_graphql(QUERY, VARIABLES, Priority.BACKGROUND, 0.0))
+        await asyncio.sleep(0)
+        critical = asyncio.create_task(server.shopify_graphql(QUERY, VARIABLES, Priority.CRITICAL))
+        return await asyncio.gather(background, critical, return_exceptions=True)
+
+    background, critical = asyncio.run(drive(standin, body))
+
+    assert isinstance(background, ShopifyThrottled)
+    assert len(critical["products"]["edges"]) == 40
+    assert shopify_standin.calls["served"] == 1
+    assert shopify_standin.calls["throttled"] == 0